@@ -0,0 +1,84 @@
+import random
+
+# Labels of the custom attributes every product carries
+ATTRIBUTE_LABELS = {'color': 'Color', 'weight': 'Weight'}
+
+
+class SyntheticCatalog:
+    """ Deterministic catalog of Upscale products and categories.
+
+    Products are generated from their index on demand, so catalogs of a million products take no memory
+    and every run of a benchmark sees exactly the same data """
+
+    def __init__(self, products, categories=None, max_categories_per_product=3, seed=0):
+        self.products = products
+        self.categories = categories if categories is not None else max(10, products // 100)
+        self.max_categories_per_product = max_categories_per_product
+        self.seed = seed
+
+    def product_id(self, index):
+        return 'product-{:07d}'.format(index)
+
+    def category_id(self, index):
+        return 'category-{:05d}'.format(index)
+
+    def product(self, index):
+        rng = random.Random(self.seed * 1000003 + index)
+        category_count = rng.randint(1, self.max_categories_per_product)
+        price = round(rng.uniform(1, 500), 2)
+
+        return {
+            'id': self.product_id(index),
+            'sku': self.product_id(index),
+            'name': 'Product {}'.format(index),
+            'description': 'Synthetic product {} used to benchmark the tap'.format(index),
+            'price': {
+                'originalPrice': price,
+                'sellingPrice': price,
+                'surcharge': {}
+            },
+            'media': [
+                {'fullSize': 'https://media.test.com/{}/{}.jpg'.format(self.product_id(index), image)}
+                for image in range(rng.randint(0, 3))
+            ],
+            'customAttributes': {
+                'color': rng.choice(['black', 'white', 'red', 'blue']),
+                'weight': str(rng.randint(1, 5000))
+            },
+            'productCategoryIds': [
+                self.category_id(rng.randrange(self.categories)) for _ in range(category_count)
+            ]
+        }
+
+    def attribute(self, key):
+        if key not in ATTRIBUTE_LABELS:
+            return None
+        return {'attributeKey': key, 'label': ATTRIBUTE_LABELS[key]}
+
+    def category(self, index):
+        return {
+            'id': self.category_id(index),
+            'name': 'Category {}'.format(index)
+        }
+
+    def quantity_available(self, product_id):
+        return random.Random(product_id).randint(0, 100)
+
+    def product_page(self, page_number, page_size):
+        return self._page(self.products, self.product, page_number, page_size)
+
+    def category_page(self, page_number, page_size):
+        return self._page(self.categories, self.category, page_number, page_size)
+
+    def _page(self, total, build, page_number, page_size):
+        start = (page_number - 1) * page_size
+        return {
+            'links': [],
+            'content': [build(index) for index in range(start, min(start + page_size, total))],
+            'page': {
+                'size': page_size,
+                'totalElements': total,
+                'totalPages': max(1, -(-total // page_size)),
+                'number': page_number
+            }
+        }
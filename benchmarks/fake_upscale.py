@@ -0,0 +1,130 @@
+import json
+import random
+import re
+import threading
+import time
+
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+PRODUCT_SEARCH = re.compile(r'^/consumer/product-content/sellingtrees/[^/]+/products$')
+CATEGORY_SEARCH = re.compile(r'^/consumer/product-content/categories$')
+CATEGORY = re.compile(r'^/consumer/product-content/categories/([^/]+)$')
+CUSTOM_ATTRIBUTE = re.compile(r'^/consumer/product-content/custom-attributes/([^/]+)$')
+INVENTORY_SEARCH = re.compile(r'^/consumer/inventory-service/atp$')
+
+
+class FakeUpscaleServer:
+    """ Local stand-in for the Upscale product content and inventory APIs, serving a synthetic catalog.
+
+    Every response is delayed by `latency` seconds, plus up to `jitter` seconds, and a share of `error_rate`
+    requests fail with 503 so the retry path is exercised. Requests are counted per endpoint """
+
+    def __init__(self, catalog, latency=0.0, jitter=0.0, error_rate=0.0, seed=0):
+        self.catalog = catalog
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+
+        self.requests = Counter()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def address(self):
+        host, port = self._server.server_address
+        return '{}:{}'.format(host, port)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def respond(self, path, query):
+        """ Return the status code and body of a request, or None when the path is unknown """
+        if PRODUCT_SEARCH.match(path):
+            endpoint = 'product_search'
+        elif CATEGORY_SEARCH.match(path):
+            endpoint = 'category_search'
+        elif CATEGORY.match(path):
+            endpoint = 'category'
+        elif CUSTOM_ATTRIBUTE.match(path):
+            endpoint = 'custom_attribute'
+        elif INVENTORY_SEARCH.match(path):
+            endpoint = 'inventory_search'
+        else:
+            return 404, None
+
+        with self._lock:
+            self.requests[endpoint] += 1
+            delay = self.latency + self._random.uniform(0, self.jitter)
+            failed = self._random.random() < self.error_rate
+
+        if delay > 0:
+            time.sleep(delay)
+        if failed:
+            with self._lock:
+                self.requests['errors'] += 1
+            return 503, None
+
+        if endpoint == 'product_search':
+            return 200, self.catalog.product_page(int(query['pageNumber'][0]), int(query['pageSize'][0]))
+        if endpoint == 'category_search':
+            return 200, self.catalog.category_page(int(query['pageNumber'][0]), int(query['pageSize'][0]))
+        if endpoint == 'category':
+            index = int(CATEGORY.match(path).group(1).rsplit('-', 1)[-1])
+            if index >= self.catalog.categories:
+                return 404, None
+            return 200, self.catalog.category(index)
+        if endpoint == 'custom_attribute':
+            attribute = self.catalog.attribute(CUSTOM_ATTRIBUTE.match(path).group(1))
+            return (404, None) if attribute is None else (200, attribute)
+
+        product_ids = query['productIds'][0].split(',')
+        return 200, {'atpChecks': [
+            {
+                'productId': product_id,
+                'quantityAvailable': self.catalog.quantity_available(product_id),
+                'availability': True,
+                'inventoryLevel': 'IN_STOCK'
+            } for product_id in product_ids
+        ]}
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # Headers and body go out in one segment, so keep-alive requests don't stall on delayed ACKs
+            wbufsize = -1
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                url = urlsplit(self.path)
+                status, body = server.respond(url.path, parse_qs(url.query))
+
+                content = json.dumps(body).encode('utf-8') if body is not None else b''
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
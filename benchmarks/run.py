@@ -0,0 +1,209 @@
+""" Run the tap end to end against a local fake Upscale server and report how it scales.
+
+    python -m benchmarks.run --products 1000 10000 100000 --latency 0.02 --max-concurrent-pages 4
+
+Every scenario runs in its own process so peak RSS is measured per scenario. Results are printed, compared
+with the previous result of the same scenario measured on another commit, and appended as JSON lines to
+bench_output.txt """
+import argparse
+import io
+import json
+import logging
+import os
+import resource
+import subprocess
+import sys
+import time
+
+from contextlib import redirect_stdout
+
+DEFAULT_OUTPUT = 'bench_output.txt'
+
+
+class OutputSink(io.TextIOBase):
+    """ Stands in for stdout, counting the Singer messages written by the tap instead of keeping them """
+
+    def __init__(self):
+        self.buffer = self
+        self.bytes = 0
+        self.records = 0
+
+    def write(self, data):
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        self.bytes += len(data)
+        self.records += data.count(b'{"type":"RECORD"')
+        return len(data)
+
+    def flush(self):
+        pass
+
+
+class MetricCollector(logging.Handler):
+    """ Collects the Singer METRIC messages logged by the tap """
+
+    def __init__(self):
+        super().__init__()
+        self.points = []
+
+    def emit(self, record):
+        message = record.getMessage()
+        if message.startswith('METRIC: '):
+            self.points.append(json.loads(message[len('METRIC: '):]))
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def commit():
+    try:
+        return subprocess.run(['git', 'describe', '--always', '--dirty'],
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_scenario(scenario):
+    """ Sync a synthetic catalog served by a fake Upscale server, in this process """
+    import singer
+
+    from benchmarks.catalog import SyntheticCatalog
+    from benchmarks.fake_upscale import FakeUpscaleServer
+    from tap_sap_upscale import discover, sync
+    # singer.get_logger() resets the logging handlers, so the modules calling it are loaded before the collector
+    # is added. The sync modules are otherwise only imported once sync() runs
+    import tap_sap_upscale.runner  # pylint: disable=unused-import
+
+    catalog = SyntheticCatalog(scenario['products'], seed=scenario['seed'])
+    server = FakeUpscaleServer(catalog,
+                               latency=scenario['latency'],
+                               jitter=scenario['jitter'],
+                               error_rate=scenario['error_rate'],
+                               seed=scenario['seed'])
+
+    config = {
+        'tenant_id': 'bench',
+        'api_scheme': 'http',
+        'api_base_url': server.address,
+        'api_selling_tree': 'bench-selling-tree',
+        'ui_scheme': 'https',
+        'ui_base_url': 'storefront.test.com',
+        'page_size': scenario['page_size'],
+        'max_concurrent_pages': scenario['max_concurrent_pages'],
+        'retry_backoff_base': 0.01,
+        'log_level': 'INFO'
+    }
+    config.update(scenario['config'])
+
+    collector = MetricCollector()
+    singer.get_logger().addHandler(collector)
+    sink = OutputSink()
+
+    with server:
+        started_at = time.perf_counter()
+        with redirect_stdout(sink):
+            sync(config, {}, discover())
+        elapsed = time.perf_counter() - started_at
+
+    phases = {point['tags']['phase']: point['value']
+              for point in collector.points if point['metric'] == 'sync_phase_duration'}
+
+    return {
+        'records': sink.records,
+        'output_bytes': sink.bytes,
+        'seconds': round(elapsed, 3),
+        'records_per_second': round(sink.records / elapsed, 1),
+        'products_per_second': round(scenario['products'] / elapsed, 1),
+        'peak_rss_mb': peak_rss_mb(),
+        'requests': dict(server.requests),
+        'phases': phases
+    }
+
+
+def run_isolated(scenario):
+    """ Run a scenario in a fresh interpreter and return its results """
+    process = subprocess.run([sys.executable, '-m', 'benchmarks.run', '--scenario', json.dumps(scenario)],
+                             stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+                             cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    if process.returncode != 0:
+        raise Exception('Scenario {} failed:\n{}'.format(scenario, process.stderr[-4000:]))
+
+    return json.loads(process.stdout.splitlines()[-1])
+
+
+def previous_results(path):
+    try:
+        with open(path) as file:
+            return [json.loads(line) for line in file if line.strip()]
+    except FileNotFoundError:
+        return []
+
+
+def compare(result, history):
+    """ Change in throughput against the latest result of the same scenario on another commit """
+    for previous in reversed(history):
+        if previous['scenario'] == result['scenario'] and previous['commit'] != result['commit']:
+            change = result['results']['records_per_second'] / previous['results']['records_per_second'] - 1
+            return '{:+.1%} vs {}'.format(change, previous['commit'])
+
+    return ''
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description='Benchmark the tap against a local fake Upscale server')
+    parser.add_argument('--products', type=int, nargs='+', default=[1000, 10000],
+                        help='Catalog sizes to benchmark, up to 1000000')
+    parser.add_argument('--page-size', type=int, default=50)
+    parser.add_argument('--max-concurrent-pages', type=int, default=1)
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds added to every response')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Random extra latency of up to this many seconds')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Share of requests failing with 503')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--config', type=json.loads, default={}, help='JSON object of extra tap config')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT)
+    parser.add_argument('--scenario', type=json.loads, help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    if args.scenario is not None:
+        with redirect_stdout(sys.stderr):
+            results = run_scenario(args.scenario)
+        print(json.dumps(results))
+        return
+
+    history = previous_results(args.output)
+    revision = commit()
+
+    for products in args.products:
+        scenario = {
+            'products': products,
+            'page_size': args.page_size,
+            'max_concurrent_pages': args.max_concurrent_pages,
+            'latency': args.latency,
+            'jitter': args.jitter,
+            'error_rate': args.error_rate,
+            'seed': args.seed,
+            'config': args.config
+        }
+        result = {'commit': revision, 'scenario': scenario, 'results': run_isolated(scenario)}
+
+        results = result['results']
+        print('{:>8} products: {:>10.1f} records/s {:>8.2f}s {:>8.1f} MB peak RSS {:>7} requests  {}'.format(
+            products, results['records_per_second'], results['seconds'], results['peak_rss_mb'],
+            sum(count for endpoint, count in results['requests'].items() if endpoint != 'errors'),
+            compare(result, history)))
+        print('          phases: ' + ', '.join(
+            '{} {:.2f}s'.format(phase, seconds) for phase, seconds in results['phases'].items()))
+
+        with open(args.output, 'a') as file:
+            file.write(json.dumps(result) + '\n')
+
+
+if __name__ == '__main__':
+    main()
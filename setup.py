@@ -17,11 +17,16 @@ setup(
         "singer-python",
         "requests",
     ],
+    extras_require={
+        "brotli": ["brotli"],
+        "orjson": ["orjson"],
+        "ijson": ["ijson"],
+    },
     entry_points="""
     [console_scripts]
     tap-sap-upscale=tap_sap_upscale:main
     """,
-    packages=find_packages(),
+    packages=find_packages(exclude=["benchmarks", "benchmarks.*"]),
     package_data = {
         "schemas": ["tap_sap_upscale/schemas/*.json"]
     },
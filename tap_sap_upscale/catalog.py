@@ -0,0 +1,83 @@
+import hashlib
+import json
+import os
+
+from tap_sap_upscale.record.record import Record
+
+# Version of the layout of the compiled catalog. Artifacts of another version are compiled again
+CATALOG_VERSION = 1
+
+SCHEMAS_DIR = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'schemas')
+CATALOG_PATH = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'catalog.json')
+
+KEY_PROPERTIES = {
+    Record.CATEGORY.value: ['id'],
+    Record.CUSTOMER_SPECIFIC_PRICE.value: ['customerId', 'tenantId', 'sku'],
+    Record.PRICE_POINT.value: ['id'],
+    Record.PRODUCT.value: ['sku', 'tenantId'],
+    Record.CATEGORY_PRODUCT.value: ['sku', 'tenantId', 'categoryId'],
+    Record.PRODUCT_SPEC.value: ['tenantId', 'sku', 'specId'],
+    Record.SPEC.value: ['id'],
+    Record.STOCK_POINT.value: ['id']
+}
+
+
+def read_schemas():
+    """ Read the JSON schema of every stream from the schemas folder, keyed by stream """
+    schemas = {}
+    for filename in sorted(os.listdir(SCHEMAS_DIR)):
+        with open(os.path.join(SCHEMAS_DIR, filename)) as file:
+            schemas[filename.replace('.json', '')] = json.load(file)
+
+    return schemas
+
+
+def schemas_digest():
+    """ Digest of the schema files and key properties a catalog is compiled from.
+    The files are hashed as they are, so checking a compiled catalog does not parse them """
+    digest = hashlib.sha256(json.dumps(KEY_PROPERTIES, sort_keys=True).encode('utf-8'))
+    for filename in sorted(os.listdir(SCHEMAS_DIR)):
+        digest.update(filename.encode('utf-8'))
+        with open(os.path.join(SCHEMAS_DIR, filename), 'rb') as file:
+            digest.update(file.read())
+
+    return digest.hexdigest()
+
+
+def compile_catalog():
+    """ Build the discovered catalog from the schemas, with every stream selected """
+    schemas = read_schemas()
+    streams = []
+    for stream, schema in schemas.items():
+        streams.append({
+            'tap_stream_id': stream,
+            'stream': stream,
+            'schema': schema,
+            'key_properties': KEY_PROPERTIES.get(stream, []),
+            'metadata': [{'metadata': {'selected': True}, 'breadcrumb': []}] if stream in KEY_PROPERTIES else []
+        })
+
+    return {'version': CATALOG_VERSION, 'digest': schemas_digest(), 'streams': streams}
+
+
+def write_catalog(path=CATALOG_PATH):
+    """ Compile the catalog shipped with the tap. Run after changing a schema or key properties """
+    with open(path + '.tmp', 'w') as file:
+        json.dump(compile_catalog(), file, indent=2, sort_keys=True)
+        file.write('\n')
+    os.replace(path + '.tmp', path)
+
+
+def load_catalog(path=CATALOG_PATH):
+    """ Load the compiled catalog in a single read, compiling it again when it is missing, of another version,
+    or compiled from other schemas than the ones in the schemas folder """
+    try:
+        with open(path) as file:
+            catalog = json.load(file)
+    except (FileNotFoundError, ValueError):
+        catalog = None
+
+    if catalog is None or catalog.get('version') != CATALOG_VERSION or catalog.get('digest') != schemas_digest():
+        catalog = compile_catalog()
+
+    return {'streams': catalog['streams']}
@@ -0,0 +1,120 @@
+import threading
+
+from concurrent.futures import Future
+from urllib.parse import quote
+
+
+class AtpBatcher:
+    """ Packs ATP lookups into batches of product ids bounded by an id count and by the length of the URL.
+
+    Lookups submitted within `linger` seconds of each other are coalesced, so the ids of several product
+    pages can share requests. Batches run concurrently on the fetch scheduler and their results are merged """
+
+    def __init__(self, fetch_batch, scheduler, base_url_bytes, max_ids=50, max_url_bytes=2048, linger=0):
+        self.fetch_batch = fetch_batch
+        self.scheduler = scheduler
+        self.base_url_bytes = base_url_bytes
+        self.max_ids = max_ids
+        self.max_url_bytes = max_url_bytes
+        self.linger = linger
+
+        self._lock = threading.Lock()
+        self._pending = []
+        self._pending_ids = 0
+        self._timer = None
+
+    def batches(self, product_ids):
+        """ Split product ids into batches respecting both the id count and the URL byte budget """
+        batches = []
+        batch = []
+        url_bytes = self.base_url_bytes
+
+        for product_id in product_ids:
+            # Every id but the first one is preceded by a comma
+            id_bytes = len(quote(product_id, safe='')) + (1 if batch else 0)
+            if batch and (len(batch) >= self.max_ids or url_bytes + id_bytes > self.max_url_bytes):
+                batches.append(batch)
+                batch = []
+                url_bytes = self.base_url_bytes
+                id_bytes -= 1
+
+            batch.append(product_id)
+            url_bytes += id_bytes
+
+        if batch:
+            batches.append(batch)
+
+        return batches
+
+    def submit(self, product_ids):
+        """ Return a future of the quantities available of the given product ids, keyed by product id """
+        future = Future()
+        if len(product_ids) == 0:
+            future.set_result({})
+            return future
+
+        with self._lock:
+            self._pending.append((product_ids, future))
+            self._pending_ids += len(product_ids)
+
+            flush_now = self.linger <= 0 or self._pending_ids >= self.max_ids
+            if not flush_now and self._timer is None:
+                self._timer = threading.Timer(self.linger, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+        if flush_now:
+            self.flush()
+
+        return future
+
+    def lookup(self, product_ids):
+        return self.submit(product_ids).result()
+
+    def flush(self):
+        with self._lock:
+            lookups = self._pending
+            self._pending = []
+            self._pending_ids = 0
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+        if len(lookups) == 0:
+            return
+
+        product_ids = list(dict.fromkeys(product_id for ids, _ in lookups for product_id in ids))
+        batches = [self.scheduler.submit(self.fetch_batch, batch) for batch in self.batches(product_ids)]
+
+        merged = {}
+        remaining = [len(batches)]
+        lock = threading.Lock()
+
+        def complete(result=None, error=None):
+            for _, future in lookups:
+                if future.cancelled():
+                    continue
+                if error is not None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(result)
+
+        def merge(batch):
+            with lock:
+                if remaining[0] == 0:
+                    # Another batch failed and the lookups have already been completed
+                    return
+
+                if batch.cancelled() or batch.exception() is not None:
+                    remaining[0] = 0
+                    complete(error=batch.exception() if not batch.cancelled() else RuntimeError(
+                        'ATP lookup was cancelled'))
+                    return
+
+                merged.update(batch.result())
+                remaining[0] -= 1
+                if remaining[0] == 0:
+                    complete(result=merged)
+
+        for batch in batches:
+            batch.add_done_callback(merge)
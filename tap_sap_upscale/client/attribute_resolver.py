@@ -0,0 +1,105 @@
+import json
+import os
+import threading
+import time
+
+import singer
+
+LOGGER = singer.get_logger()
+
+DEFAULT_TTL = 24 * 60 * 60
+
+
+class AttributeResolver:
+    """ Resolves the metadata of the custom attributes carried by products, requesting each attribute key once.
+
+    Lookups are memoized, including the ones still in flight, so pages referencing the same key concurrently
+    share a single request. Keys can be prefetched as soon as a product page is parsed. Attributes Upscale
+    does not know are remembered too. The cache is optionally persisted to `path` between runs, with keys
+    including the edition, and entries older than `ttl` seconds are requested again by the next run """
+
+    VERSION = 1
+
+    def __init__(self, fetch_attribute, scheduler, edition_id=None, path=None, ttl=DEFAULT_TTL):
+        self.fetch_attribute = fetch_attribute
+        self.scheduler = scheduler
+        self.edition_id = edition_id
+        self.path = path
+        self.ttl = ttl
+
+        self._lock = threading.Lock()
+        self._entries = self._load()
+        self._pending = {}
+        # Keys requested by this run are never requested again, whatever the TTL
+        self._fetched = set()
+
+    def prefetch(self, keys):
+        """ Start requesting the keys which are neither cached nor already requested.
+        Returns the futures of the given keys still in flight """
+        futures = {}
+        now = time.time()
+        with self._lock:
+            for key in set(keys):
+                future = self._pending.get(key)
+                if future is None:
+                    entry = self._entries.get(self._key(key))
+                    if key in self._fetched or entry is not None and now - entry['fetchedAt'] < self.ttl:
+                        continue
+
+                    future = self._pending[key] = self.scheduler.submit(self._fetch, key)
+                futures[key] = future
+
+        return futures
+
+    def resolve(self, keys):
+        """ Return the attributes of the given keys, keyed by attribute key. Unknown keys are left out """
+        keys = set(keys)
+        for future in self.prefetch(keys).values():
+            future.result()
+
+        with self._lock:
+            entries = {key: self._entries.get(self._key(key)) for key in keys}
+
+        return {key: entry['attribute'] for key, entry in entries.items()
+                if entry is not None and entry['attribute'] is not None}
+
+    def save(self):
+        if self.path is None:
+            return
+
+        with self._lock:
+            content = {'version': self.VERSION, 'attributes': dict(self._entries)}
+
+        with open(self.path + '.tmp', 'w') as file:
+            json.dump(content, file)
+        os.replace(self.path + '.tmp', self.path)
+
+    def _fetch(self, key):
+        try:
+            attribute = self.fetch_attribute(key)
+            with self._lock:
+                self._entries[self._key(key)] = {'attribute': attribute, 'fetchedAt': time.time()}
+                self._fetched.add(key)
+        finally:
+            with self._lock:
+                self._pending.pop(key, None)
+
+        return attribute
+
+    def _load(self):
+        if self.path is None:
+            return {}
+
+        try:
+            with open(self.path) as file:
+                content = json.load(file)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+        if content.get('version') != self.VERSION:
+            return {}
+
+        return content.get('attributes', {})
+
+    def _key(self, attribute_key):
+        return '{}:{}'.format(self.edition_id or '', attribute_key)
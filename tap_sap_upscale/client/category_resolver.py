@@ -0,0 +1,126 @@
+import json
+import math
+import os
+import threading
+import time
+
+import singer
+
+LOGGER = singer.get_logger()
+
+DEFAULT_TTL = 24 * 60 * 60
+
+
+class CategoryResolver:
+    """ Resolves the category ids referenced by products through a local cache of categories.
+
+    The cache is optionally persisted to `path` between runs, with keys including the edition.
+    A cold cache is filled from the full category list, a warm one only fetches the categories which are
+    missing or older than `ttl` seconds, unless so many are needed that paging through the list is cheaper.
+    As the list stores every category at once, they also expire together, so that choice is first made for
+    the whole cache by `needs_refresh` at the start of a run """
+
+    VERSION = 1
+
+    def __init__(self, fetch_categories, fetch_category, scheduler, edition_id=None, path=None, ttl=DEFAULT_TTL,
+                 page_size=50):
+        self.fetch_categories = fetch_categories
+        self.fetch_category = fetch_category
+        self.scheduler = scheduler
+        self.edition_id = edition_id
+        self.path = path
+        self.ttl = ttl
+        self.page_size = page_size
+
+        self._lock = threading.Lock()
+        self._entries = self._load()
+
+    def needs_refresh(self):
+        """ Whether the full category list should be loaded up front: when the cache of the edition is cold,
+        or when more of its categories are outdated than the list has pages """
+        prefix = self._key('')
+        now = time.time()
+        with self._lock:
+            ages = [now - entry['fetchedAt'] for key, entry in self._entries.items() if key.startswith(prefix)]
+
+        outdated = sum(1 for age in ages if age >= self.ttl)
+        return len(ages) == 0 or outdated > max(1, math.ceil(len(ages) / self.page_size))
+
+    def load_all(self):
+        """ Refresh every category from the full category list """
+        categories = self.fetch_categories()
+        self.store(categories.values())
+        return categories
+
+    def store(self, categories):
+        fetched_at = time.time()
+        with self._lock:
+            for category in categories:
+                self._entries[self._key(category.get('id'))] = {'category': category, 'fetchedAt': fetched_at}
+
+    def resolve(self, category_ids):
+        """ Return the categories of the given ids, keyed by id. Unknown ids are left out """
+        category_ids = set(category_ids)
+        categories = {}
+        outdated_ids = []
+
+        now = time.time()
+        with self._lock:
+            for category_id in category_ids:
+                entry = self._entries.get(self._key(category_id))
+                if entry is None or now - entry['fetchedAt'] >= self.ttl:
+                    outdated_ids.append(category_id)
+                else:
+                    categories[category_id] = entry['category']
+
+        if len(outdated_ids) == 0:
+            return categories
+
+        if len(outdated_ids) > self.listing_pages():
+            LOGGER.info('Refreshing all categories for %d outdated categories', len(outdated_ids))
+            fetched = self.load_all()
+            categories.update({category_id: fetched[category_id]
+                               for category_id in outdated_ids if category_id in fetched})
+            return categories
+
+        LOGGER.debug('Fetching %d outdated categories', len(outdated_ids))
+        fetched = [category for category in self.scheduler.ordered(self.fetch_category, outdated_ids, len(outdated_ids))
+                   if category is not None]
+        self.store(fetched)
+        categories.update({category.get('id'): category for category in fetched})
+
+        return categories
+
+    def listing_pages(self):
+        """ Number of requests needed to page through the categories known so far """
+        with self._lock:
+            return max(1, math.ceil(len(self._entries) / self.page_size))
+
+    def save(self):
+        if self.path is None:
+            return
+
+        with self._lock:
+            content = {'version': self.VERSION, 'categories': dict(self._entries)}
+
+        with open(self.path + '.tmp', 'w') as file:
+            json.dump(content, file)
+        os.replace(self.path + '.tmp', self.path)
+
+    def _load(self):
+        if self.path is None:
+            return {}
+
+        try:
+            with open(self.path) as file:
+                content = json.load(file)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+        if content.get('version') != self.VERSION:
+            return {}
+
+        return content.get('categories', {})
+
+    def _key(self, category_id):
+        return '{}:{}'.format(self.edition_id or '', category_id)
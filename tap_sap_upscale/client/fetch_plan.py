@@ -0,0 +1,40 @@
+from tap_sap_upscale.record.record import Record
+
+# Streams whose records are derived from product pages
+PRODUCT_STREAMS = frozenset([
+    Record.PRODUCT.value,
+    Record.CATEGORY.value,
+    Record.CATEGORY_PRODUCT.value,
+    Record.PRICE_POINT.value,
+    Record.STOCK_POINT.value,
+    Record.SPEC.value,
+    Record.PRODUCT_SPEC.value
+])
+
+CATEGORY_STREAMS = frozenset([Record.CATEGORY.value, Record.CATEGORY_PRODUCT.value])
+
+SPEC_STREAMS = frozenset([Record.SPEC.value, Record.PRODUCT_SPEC.value])
+
+
+class FetchPlan:
+    """ The Upscale data a sync needs, derived from the streams selected in the catalog.
+    Product pages are only fetched for product streams, ATP lookups only for stock points,
+    categories only for the category streams and custom attributes only for the spec streams """
+
+    def __init__(self, streams):
+        self.streams = frozenset(streams)
+        self.products = bool(self.streams & PRODUCT_STREAMS)
+        self.inventory = Record.STOCK_POINT.value in self.streams
+        self.categories = bool(self.streams & CATEGORY_STREAMS)
+        self.specs = bool(self.streams & SPEC_STREAMS)
+
+    @classmethod
+    def from_catalog(cls, catalog):
+        return cls(entry.tap_stream_id for entry in catalog.streams if entry.is_selected())
+
+    @classmethod
+    def everything(cls):
+        return cls(record.value for record in Record)
+
+    def selected(self, record):
+        return record.value in self.streams
@@ -0,0 +1,76 @@
+from collections import deque
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor
+from itertools import islice
+
+
+class FetchScheduler:
+    """ Runs Upscale requests on a bounded pool of worker threads """
+
+    def __init__(self, max_workers):
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='upscale-fetch')
+
+    def submit(self, fn, *args, **kwargs):
+        return self._executor.submit(fn, *args, **kwargs)
+
+    def then(self, future, fn):
+        """ Return a future of fn(result) that is scheduled once `future` completes.
+        When fn returns a future itself, the returned future completes with its result.
+        No worker is held while waiting, so dependent requests can't starve the pool """
+        chained = Future()
+
+        def forward(done):
+            if done.cancelled():
+                chained.set_exception(CancelledError())
+            elif done.exception() is not None:
+                chained.set_exception(done.exception())
+            elif isinstance(done.result(), Future):
+                done.result().add_done_callback(forward)
+            else:
+                chained.set_result(done.result())
+
+        def schedule(done):
+            # Once marked as running the chained future can no longer be cancelled by its consumer
+            if not chained.set_running_or_notify_cancel():
+                return
+
+            if done.cancelled() or done.exception() is not None:
+                forward(done)
+                return
+
+            try:
+                self.submit(fn, done.result()).add_done_callback(forward)
+            except RuntimeError as error:
+                # The scheduler has been shut down while the dependency was running
+                chained.set_exception(error)
+
+        future.add_done_callback(schedule)
+        return chained
+
+    def ordered(self, fn, items, window):
+        """ Yield fn(item) for every item, in the order of items, keeping at most `window` calls in flight """
+        return self.ordered_futures(lambda item: self.submit(fn, item), items, window)
+
+    def ordered_futures(self, schedule, items, window):
+        """ Yield the results of the futures returned by schedule(item), in the order of items, keeping at
+        most `window` of them pending. The first `window` items are scheduled right away and the next one is
+        scheduled before a result is handed out, so fetching overlaps the caller's work """
+        items = iter(items)
+        pending = deque(schedule(item) for item in islice(items, window))
+
+        def results():
+            try:
+                while pending:
+                    result = pending.popleft().result()
+                    for item in islice(items, 1):
+                        pending.append(schedule(item))
+
+                    yield result
+            finally:
+                for future in pending:
+                    future.cancel()
+
+        return results()
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
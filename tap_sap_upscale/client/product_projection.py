@@ -0,0 +1,143 @@
+import json
+
+from tap_sap_upscale.record.record import Record
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+# Product fields read by the handler of each stream, as dotted paths. Fields of list items apply to every item
+STREAM_FIELDS = {
+    Record.PRODUCT.value: ['id', 'name', 'description', 'price.sellingPrice', 'media.fullSize'],
+    Record.PRICE_POINT.value: ['sku', 'price.sellingPrice'],
+    Record.STOCK_POINT.value: ['id'],
+    Record.CATEGORY.value: ['productCategoryIds'],
+    Record.CATEGORY_PRODUCT.value: ['sku', 'productCategoryIds'],
+    Record.SPEC.value: ['customAttributes'],
+    Record.PRODUCT_SPEC.value: ['sku', 'customAttributes']
+}
+
+# Fields read for every product: the ATP lookup, the category augmentation and the check for categories
+COMMON_FIELDS = ['id', 'sku', 'productCategoryIds']
+
+
+def loads(content):
+    """ Parse JSON bytes, with orjson when it is installed """
+    if orjson is not None:
+        return orjson.loads(content)
+
+    return json.loads(content)
+
+
+def parse_product_page(content, projection=None, incremental=False):
+    """ Parse a product search response into its products and paging information.
+
+    Products are projected one by one as soon as they are parsed. The incremental parser needs ijson and
+    never holds the whole parsed page, at the cost of a slower parse than orjson or json """
+    if incremental and ijson is not None:
+        return parse_product_page_incrementally(content, projection)
+
+    body = loads(content)
+    products = body['content']
+    if projection is not None:
+        products = [projection.project(product) for product in products]
+
+    return products, body['page']
+
+
+def parse_product_page_incrementally(content, projection=None):
+    """ Build the products and the paging information in a single pass over the parser events.
+    Values are built on a stack of [container, key] pairs, and each product is projected once complete """
+    products = []
+    page_info = None
+    top_key = None
+    in_content = False
+    stack = []
+
+    events = ijson.basic_parse(content, use_float=True)
+    # The response object itself is never built
+    next(events)
+    for event, value in events:
+        if event == 'map_key':
+            if stack:
+                stack[-1][1] = value
+            elif not in_content:
+                top_key = value
+            continue
+
+        if event == 'start_map':
+            stack.append([{}, None])
+            continue
+        if event == 'start_array':
+            if not stack and not in_content and top_key == 'content':
+                in_content = True
+            else:
+                stack.append([[], None])
+            continue
+        if event == 'end_map' or event == 'end_array':
+            if not stack:
+                # The end of the products, or of the response
+                in_content = False
+                continue
+            value = stack.pop()[0]
+
+        if stack:
+            container, key = stack[-1]
+            if key is None:
+                container.append(value)
+            else:
+                container[key] = value
+        elif in_content:
+            products.append(projection.project(value) if projection is not None else value)
+        elif top_key == 'page':
+            page_info = value
+
+    return products, page_info
+
+
+class ProductProjection:
+    """ Keeps only the product fields read by the handlers of the selected streams,
+    so the rest of a product is freed as soon as its page is parsed """
+
+    def __init__(self, fields):
+        # Nested dict of the kept keys, where None keeps the whole value
+        self.tree = {}
+        for field in fields:
+            node = self.tree
+            *parents, leaf = field.split('.')
+            for key in parents:
+                if key in node and node[key] is None:
+                    break
+                node = node.setdefault(key, {})
+            else:
+                node[leaf] = None
+
+    @classmethod
+    def from_plan(cls, plan):
+        fields = list(COMMON_FIELDS)
+        for stream in sorted(plan.streams):
+            fields.extend(STREAM_FIELDS.get(stream, []))
+
+        return cls(fields)
+
+    def project(self, product):
+        return project(product, self.tree)
+
+
+def project(value, tree):
+    if tree is None:
+        return value
+
+    if isinstance(value, dict):
+        return {key: project(value[key], subtree) for key, subtree in tree.items() if key in value}
+
+    if isinstance(value, list):
+        return [project(item, tree) for item in value]
+
+    return value
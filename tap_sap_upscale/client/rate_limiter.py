@@ -0,0 +1,90 @@
+import threading
+import time
+
+from collections import deque
+
+
+class AdaptiveRateLimiter:
+    """ Token bucket limiting the rate of requests sent to Upscale.
+
+    The rate is cut down multiplicatively whenever Upscale throttles a request and raised back additively
+    while responses are clean, so the limiter settles close to the highest rate the API tolerates.
+    Without an initial rate requests are not limited until the first throttled response, at which point
+    the limiter starts from the rate observed so far """
+
+    # Number of recent requests used to estimate the observed request rate
+    OBSERVED_REQUESTS = 100
+
+    def __init__(self, rate=None, max_rate=None, min_rate=1.0, decrease_factor=0.5, increase_step=0.1):
+        self.rate = rate
+        self.max_rate = max_rate if max_rate is not None else rate
+        self.min_rate = min_rate
+        self.decrease_factor = decrease_factor
+        self.increase_step = increase_step
+
+        self.throttled_responses = 0
+        self.throttle_time = 0.0
+
+        self._lock = threading.Lock()
+        self._tokens = 1.0
+        self._updated_at = time.monotonic()
+        self._paused_until = 0.0
+        self._recent_requests = deque(maxlen=self.OBSERVED_REQUESTS)
+
+    def acquire(self):
+        """ Wait until a request may be sent. Returns the number of seconds waited """
+        with self._lock:
+            now = time.monotonic()
+            self._recent_requests.append(now)
+
+            wait = max(0.0, self._paused_until - now)
+            if self.rate is not None:
+                self._tokens = min(self._burst(), self._tokens + (now - self._updated_at) * self.rate)
+                self._updated_at = now
+
+                # The token is reserved right away, so concurrent callers queue up behind each other
+                self._tokens -= 1
+                if self._tokens < 0:
+                    wait = max(wait, -self._tokens / self.rate)
+
+            self.throttle_time += wait
+
+        if wait > 0:
+            time.sleep(wait)
+
+        return wait
+
+    def throttled(self, retry_after=None):
+        """ Slow down after Upscale answered 429. All requests are held back for `retry_after` seconds """
+        with self._lock:
+            self.throttled_responses += 1
+
+            rate = self.rate if self.rate is not None else self._observed_rate()
+            self.rate = max(self.min_rate, rate * self.decrease_factor)
+            self._tokens = min(self._tokens, 0.0)
+
+            if retry_after:
+                self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+
+    def succeeded(self):
+        """ Speed back up after a clean response """
+        with self._lock:
+            if self.rate is None:
+                return
+
+            self.rate += self.increase_step
+            if self.max_rate is not None:
+                self.rate = min(self.rate, self.max_rate)
+
+    def _burst(self):
+        return max(1.0, self.rate)
+
+    def _observed_rate(self):
+        if len(self._recent_requests) < 2:
+            return self.min_rate
+
+        elapsed = self._recent_requests[-1] - self._recent_requests[0]
+        if elapsed <= 0:
+            return float(len(self._recent_requests))
+
+        return (len(self._recent_requests) - 1) / elapsed
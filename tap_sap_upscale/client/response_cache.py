@@ -0,0 +1,209 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+from collections import OrderedDict
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+def normalize_url(url):
+    """ Lower-case the scheme and host and sort the query parameters, so equivalent URLs share an entry """
+    scheme, netloc, path, query, _ = urlsplit(url)
+    return urlunsplit((scheme.lower(), netloc.lower(), path, urlencode(sorted(parse_qsl(query))), None))
+
+
+class CachedResponse:
+    """ Stands in for a requests.Response when a body is served from the cache """
+
+    status_code = 200
+
+    def __init__(self, content, headers):
+        self.content = content
+        self.headers = headers
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8')
+
+    def json(self):
+        return json.loads(self.content)
+
+    def close(self):
+        pass
+
+
+class CacheEntry:
+    def __init__(self, key, url, etag, last_modified, stored_at, size):
+        self.key = key
+        self.url = url
+        self.etag = etag
+        self.last_modified = last_modified
+        self.stored_at = stored_at
+        self.size = size
+
+    def conditional_headers(self):
+        headers = {}
+        if self.etag is not None:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified is not None:
+            headers['If-Modified-Since'] = self.last_modified
+
+        return headers
+
+    def headers(self):
+        headers = {}
+        if self.etag is not None:
+            headers['ETag'] = self.etag
+        if self.last_modified is not None:
+            headers['Last-Modified'] = self.last_modified
+
+        return headers
+
+    def to_dict(self):
+        return {
+            'url': self.url,
+            'etag': self.etag,
+            'lastModified': self.last_modified,
+            'storedAt': self.stored_at,
+            'size': self.size
+        }
+
+
+class ResponseCache:
+    """ Persistent cache of Upscale response bodies keyed by their normalized URL.
+
+    Entries younger than the endpoint's TTL are served without a request. Older entries are revalidated
+    with a conditional request and their body is reused when Upscale answers 304 Not Modified.
+    The least recently used entries are evicted once the bodies exceed `max_bytes` """
+
+    INDEX_FILE = 'index.json'
+
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES, ttls=None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttls = ttls if ttls is not None else {}
+        self.total_bytes = 0
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+        os.makedirs(directory, exist_ok=True)
+        self._load_index()
+
+    @classmethod
+    def from_config(cls, config):
+        directory = config.get('response_cache_dir')
+        if directory is None:
+            return None
+
+        ttls = config.get('response_cache_ttl', {})
+        return cls(directory,
+                   max_bytes=int(config.get('response_cache_max_bytes', DEFAULT_MAX_BYTES)),
+                   ttls=ttls if isinstance(ttls, dict) else {None: ttls})
+
+    def lookup(self, url):
+        key = self._key(url)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+
+            return entry
+
+    def ttl(self, endpoint):
+        return self.ttls.get(endpoint, self.ttls.get(None, 0))
+
+    def is_fresh(self, entry, endpoint):
+        return time.time() - entry.stored_at < self.ttl(endpoint)
+
+    def load(self, entry):
+        """ Read the cached body of an entry, or None when it has been evicted in the meantime """
+        try:
+            with open(self._body_path(entry.key), 'rb') as file:
+                return CachedResponse(file.read(), entry.headers())
+        except FileNotFoundError:
+            return None
+
+    def revalidated(self, entry):
+        with self._lock:
+            entry.stored_at = time.time()
+
+    def store(self, endpoint, url, response):
+        """ Cache a 200 response. Only responses that can be revalidated or have a TTL are kept """
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if etag is None and last_modified is None and not self.ttl(endpoint):
+            return
+
+        content = response.content
+
+        key = self._key(url)
+        entry = CacheEntry(key, url, etag, last_modified, time.time(), len(content))
+        with self._lock:
+            # Replace the body atomically, so concurrent readers never see a partial write
+            with open(self._body_path(key) + '.tmp', 'wb') as file:
+                file.write(content)
+            os.replace(self._body_path(key) + '.tmp', self._body_path(key))
+
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.total_bytes -= previous.size
+
+            self._entries[key] = entry
+            self.total_bytes += entry.size
+            self._evict()
+
+    def save(self):
+        """ Persist the index, in least to most recently used order """
+        with self._lock:
+            index = {key: entry.to_dict() for key, entry in self._entries.items()}
+
+        path = os.path.join(self.directory, self.INDEX_FILE)
+        with open(path + '.tmp', 'w') as file:
+            json.dump(index, file)
+        os.replace(path + '.tmp', path)
+
+    def _evict(self):
+        while self.total_bytes > self.max_bytes and self._entries:
+            key, entry = self._entries.popitem(last=False)
+            self.total_bytes -= entry.size
+            self._remove_body(key)
+
+    def _load_index(self):
+        try:
+            with open(os.path.join(self.directory, self.INDEX_FILE)) as file:
+                index = json.load(file)
+        except (FileNotFoundError, ValueError):
+            index = {}
+
+        for key, value in index.items():
+            if not os.path.exists(self._body_path(key)):
+                continue
+
+            self._entries[key] = CacheEntry(
+                key, value['url'], value['etag'], value['lastModified'], value['storedAt'], value['size'])
+            self.total_bytes += value['size']
+
+        # Bodies written by a run that was interrupted before saving its index can't be revalidated
+        for filename in os.listdir(self.directory):
+            key, extension = os.path.splitext(filename)
+            if extension == '.body' and key not in self._entries:
+                self._remove_body(key)
+
+        self._evict()
+
+    def _key(self, url):
+        return hashlib.sha256(normalize_url(url).encode('utf-8')).hexdigest()
+
+    def _body_path(self, key):
+        return os.path.join(self.directory, key + '.body')
+
+    def _remove_body(self, key):
+        try:
+            os.remove(self._body_path(key))
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,63 @@
+import threading
+
+import requests
+
+from requests.adapters import HTTPAdapter
+from urllib3.util.request import ACCEPT_ENCODING
+
+from tap_sap_upscale.client.response_cache import ResponseCache
+
+DEFAULT_TIMEOUT = 10
+DEFAULT_MAX_CONCURRENT_REQUESTS = 16
+
+
+def build_session(config, pool_size):
+    """ Build a keep-alive session whose connection pool is shared by every Upscale endpoint.
+    Compressed transfers are negotiated for every encoding urllib3 can decode here,
+    which includes brotli when the brotli package is installed """
+    session = requests.Session()
+    session.verify = False
+    session.headers.update({
+        'Accept-Language': 'en-US',
+        'Accept-Encoding': ACCEPT_ENCODING
+    })
+
+    if not config.get('http_keep_alive', True):
+        session.headers['Connection'] = 'close'
+
+    pool_size = int(config.get('http_pool_size', pool_size))
+    adapter = HTTPAdapter(pool_maxsize=pool_size, pool_block=True)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+
+    return session
+
+
+class SharedTransport:
+    """ HTTP resources shared by the clients of every target of a multi-target sync: one connection pool,
+    one response cache and a cap on the requests in flight across all targets """
+
+    def __init__(self, config):
+        self.max_concurrent_requests = int(config.get('max_concurrent_requests', DEFAULT_MAX_CONCURRENT_REQUESTS))
+        self.request_slots = threading.BoundedSemaphore(self.max_concurrent_requests)
+        self.session = build_session(config, pool_size=self.max_concurrent_requests)
+        self.response_cache = ResponseCache.from_config(config)
+
+    def close(self):
+        self.session.close()
+        if self.response_cache is not None:
+            self.response_cache.save()
+
+
+def build_timeouts(config, endpoints):
+    """ Resolve the timeout of each endpoint from `request_timeouts`, falling back to `request_timeout`.
+    A timeout can either be a number of seconds or a [connect, read] pair """
+    default_timeout = config.get('request_timeout', DEFAULT_TIMEOUT)
+    endpoint_timeouts = config.get('request_timeouts', {})
+
+    timeouts = {}
+    for endpoint in endpoints:
+        timeout = endpoint_timeouts.get(endpoint, default_timeout)
+        timeouts[endpoint] = tuple(timeout) if isinstance(timeout, list) else timeout
+
+    return timeouts
@@ -0,0 +1,40 @@
+import re
+
+
+class Shard:
+    """ One of `count` independent syncs splitting the product pages of a catalog between them.
+
+    Shard `index`, counted from 1, syncs a contiguous range of pages, so the shards together cover
+    every page exactly once and each of them can resume its own range from its own state """
+
+    def __init__(self, index, count):
+        if count < 1 or not 1 <= index <= count:
+            raise Exception('Invalid shard {}/{}, the shard must be between 1 and the number of shards'.format(
+                index, count))
+
+        self.index = index
+        self.count = count
+
+    @classmethod
+    def parse(cls, value):
+        """ Parse a shard given as `index/count`, such as `2/4` """
+        match = re.fullmatch(r'\s*(\d+)\s*/\s*(\d+)\s*', str(value))
+        if match is None:
+            raise Exception('Invalid shard {}, expected the form i/n such as 2/4'.format(value))
+
+        return cls(int(match.group(1)), int(match.group(2)))
+
+    @classmethod
+    def from_config(cls, config):
+        value = config.get('shard')
+        return cls.parse(value) if value is not None else None
+
+    def page_range(self, total_pages):
+        """ The pages of this shard out of `total_pages`. Shards differ by at most one page """
+        first_page = (self.index - 1) * total_pages // self.count + 1
+        last_page = self.index * total_pages // self.count
+
+        return range(first_page, last_page + 1)
+
+    def __str__(self):
+        return '{}/{}'.format(self.index, self.count)
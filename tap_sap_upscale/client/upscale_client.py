@@ -1,11 +1,51 @@
-from urllib.parse import urlunparse
+import random
+import threading
+import time
+
+from collections import Counter, namedtuple
+from concurrent.futures import Future
+from contextlib import nullcontext
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import quote, urlunparse
 
 import requests
 import singer
 import urllib3
 
+from tap_sap_upscale.client.atp_batcher import AtpBatcher
+from tap_sap_upscale.client.attribute_resolver import AttributeResolver
+from tap_sap_upscale.client.category_resolver import DEFAULT_TTL, CategoryResolver
+from tap_sap_upscale.client.fetch_plan import FetchPlan
+from tap_sap_upscale.client.fetch_scheduler import FetchScheduler
+from tap_sap_upscale.client.product_projection import parse_product_page
+from tap_sap_upscale.client.rate_limiter import AdaptiveRateLimiter
+from tap_sap_upscale.client.response_cache import ResponseCache
+from tap_sap_upscale.client.session import build_session, build_timeouts
+from tap_sap_upscale.metrics.sync_metrics import SyncMetrics
+
 LOGGER = singer.get_logger()
 
+# A single page of augmented products together with Upscale's paging information
+ProductPage = namedtuple('ProductPage', ['number', 'products', 'page_info'])
+
+def parse_retry_after(response):
+    """ Seconds to wait according to the Retry-After header, which is either a delay or an HTTP date """
+    retry_after = response.headers.get('Retry-After')
+    if retry_after is None:
+        return None
+
+    try:
+        return max(0.0, float(retry_after))
+    except ValueError:
+        pass
+
+    try:
+        return max(0.0, (parsedate_to_datetime(retry_after) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
 class UpscaleClient:
     PRODUCT_CONTENT_PATH = '/consumer/product-content'
     INVENTORY_CONTENT_PATH = 'consumer/inventory-service'
@@ -18,17 +58,89 @@ class UpscaleClient:
     INVENTORY_SEARCH_PATH = '/atp?productIds={}'
 
     CATEGORY_SEARCH_PATH = '/categories?pageNumber={}&pageSize={}'
+    CATEGORY_PATH = '/categories/{}'
     CUSTOM_ATTRIBUTE_PATH = '/custom-attributes/{}'
 
     # Upscale appears to have a 50 items per-page maximum. 
     PAGE_SIZE = 50
 
-    def __init__(self, config):
+    # Endpoint names used to configure per-endpoint behaviour such as timeouts
+    PRODUCT_SEARCH_ENDPOINT = 'product_search'
+    INVENTORY_SEARCH_ENDPOINT = 'inventory_search'
+    CATEGORY_SEARCH_ENDPOINT = 'category_search'
+    CATEGORY_ENDPOINT = 'category'
+    CUSTOM_ATTRIBUTE_ENDPOINT = 'custom_attribute'
+
+    # Transient failures which are retried with a jittered exponential backoff
+    RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+    # Inventory changes all the time, so only catalog content goes through the response cache
+    CACHEABLE_ENDPOINTS = (PRODUCT_SEARCH_ENDPOINT, CATEGORY_SEARCH_ENDPOINT, CATEGORY_ENDPOINT, CUSTOM_ATTRIBUTE_ENDPOINT)
+
+    def __init__(self, config, metrics=None, plan=None, projection=None, transport=None):
         self.scheme = config.get('api_scheme')
         self.base_url = config.get('api_base_url')
         self.edition_id = config.get('api_edition_id')
         self.selling_tree = config.get('api_selling_tree')
 
+        self.page_size = int(config.get('page_size', self.PAGE_SIZE))
+
+        # Inventory and categories are only fetched when the selected streams need them
+        self.plan = plan if plan is not None else FetchPlan.everything()
+
+        # Products are optionally projected down to the fields the selected streams read, right after parsing
+        self.projection = projection
+        self.incremental_json_parsing = config.get('incremental_json_parsing', False)
+
+        # Number of product pages requested concurrently. Pages are still handed out in page order.
+        self.max_concurrent_pages = int(config.get('max_concurrent_pages', 1))
+        self._page_slots = threading.BoundedSemaphore(self.max_concurrent_pages)
+
+        # ATP lookups are batched independently from the product pages
+        self.max_concurrent_atp_batches = int(config.get('atp_max_concurrent_batches', 2))
+        self._atp_slots = threading.BoundedSemaphore(self.max_concurrent_atp_batches)
+
+        # Every page in the pipeline uses at most one worker at a time, on top of the workers
+        # running ATP batches and the one paging through categories
+        self.scheduler = FetchScheduler(
+            max_workers=self.max_concurrent_pages + self.max_concurrent_atp_batches + 2)
+
+        # A single keep-alive session is shared by all endpoints and worker threads,
+        # and with the clients of the other targets when a transport is given
+        self.transport = transport
+        if transport is not None:
+            self.session = transport.session
+            self._request_slots = transport.request_slots
+        else:
+            self.session = build_session(config, pool_size=self.scheduler.max_workers)
+            self._request_slots = nullcontext()
+        self.timeouts = build_timeouts(config, [
+            self.PRODUCT_SEARCH_ENDPOINT,
+            self.INVENTORY_SEARCH_ENDPOINT,
+            self.CATEGORY_SEARCH_ENDPOINT,
+            self.CATEGORY_ENDPOINT,
+            self.CUSTOM_ATTRIBUTE_ENDPOINT
+        ])
+
+        self.max_retries = int(config.get('max_retries', 5))
+        self.retry_backoff_base = float(config.get('retry_backoff_base', 0.5))
+        self.retry_backoff_max = float(config.get('retry_backoff_max', 60))
+        rate_limit = config.get('rate_limit')
+        self.rate_limiter = AdaptiveRateLimiter(
+            rate=float(rate_limit) if rate_limit is not None else None,
+            min_rate=float(config.get('min_rate_limit', 1)))
+        self.request_stats = Counter()
+        self._stats_lock = threading.Lock()
+
+        # Latency and size of every response, and the time spent fetching and augmenting product pages
+        self.metrics = metrics if metrics is not None else SyncMetrics()
+        self._category_prefetch = None
+        # First product page searched to count the pages, until it is scheduled again
+        self._first_page_search = None
+
+        # Optional persistent cache of response bodies, revalidated with conditional requests
+        self.response_cache = transport.response_cache if transport is not None else ResponseCache.from_config(config)
+
         self.product_search_url = urlunparse((
             self.scheme, self.base_url, self.PRODUCT_CONTENT_PATH + self.PRODUCT_SEARCH_PATH, None, None, None
         ))
@@ -37,6 +149,10 @@ class UpscaleClient:
             self.scheme, self.base_url, self.PRODUCT_CONTENT_PATH + self.CATEGORY_SEARCH_PATH, None, None, None
         ))
 
+        self.category_url = urlunparse((
+            self.scheme, self.base_url, self.PRODUCT_CONTENT_PATH + self.CATEGORY_PATH, None, None, None
+        ))
+
         self.custom_attribute_url = urlunparse((
             self.scheme, self.base_url, self.PRODUCT_CONTENT_PATH + self.CUSTOM_ATTRIBUTE_PATH, None, None, None
         ))
@@ -45,49 +161,285 @@ class UpscaleClient:
             self.scheme, self.base_url, self.INVENTORY_CONTENT_PATH + self.INVENTORY_SEARCH_PATH, None, None, None
         ))
 
+        self.atp_batcher = AtpBatcher(
+            self.fetch_inventory_batch,
+            self.scheduler,
+            base_url_bytes=len(self.inventory_search_url.format('')),
+            max_ids=int(config.get('atp_batch_size', self.PAGE_SIZE)),
+            max_url_bytes=int(config.get('atp_max_url_bytes', 2048)),
+            linger=float(config.get('atp_linger_seconds', 0)))
+
+        # Categories are resolved lazily, through a cache which can be persisted between runs
+        self.category_resolver = CategoryResolver(
+            self.fetch_categories,
+            self.fetch_category,
+            self.scheduler,
+            edition_id=self.edition_id,
+            path=config.get('category_cache_path'),
+            ttl=float(config.get('category_cache_ttl', DEFAULT_TTL)),
+            page_size=self.PAGE_SIZE)
+
+        # Custom attribute metadata is requested once per attribute key, through a cache which can be persisted
+        self.attribute_resolver = AttributeResolver(
+            self.fetch_custom_attribute,
+            self.scheduler,
+            edition_id=self.edition_id,
+            path=config.get('attribute_cache_path'),
+            ttl=float(config.get('attribute_cache_ttl', DEFAULT_TTL)))
+
         urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
     def fetch_products(self):
-        initial_page = 1
-
+        products = []
+        for page in self.iter_product_pages():
+            products.extend(page.products)
+
+        return products
+
+    def count_product_pages(self):
+        """ Number of product pages of the selling tree, read from the first page.
+        The first page is kept, so syncing it does not search it again """
+        self._first_page_search = self.search_product_page(1)
+        return self._first_page_search[1]['totalPages']
+
+    def iter_product_pages(self, start_page=1, enrich=True, end_page=None):
+        """ Yield augmented products one page at a time, so memory stays bounded by the page size
+        and callers can emit records before the whole catalog has been downloaded.
+
+        The category list does not depend on products, so a cold or largely outdated category cache is refreshed
+        alongside the product pages, and the ATP lookup of a page runs behind its search request while the next pages
+        are fetched.
+        Without `enrich` pages are yielded with their inventory only, and callers pass them to `enrich_page`.
+        Pages after `end_page` are left out, so shards of a sync can each fetch their own range """
         LOGGER.info('Fetching products')
-        products, page_info = self.fetch_product_search_list(initial_page, self.PAGE_SIZE)
-
-        for page in range(2, page_info['totalPages'] + 1):
-            response, _ = self.fetch_product_search_list(page, self.PAGE_SIZE)
-            products.extend(response)
-
-        augmented_products = self.augment_product_details(products)        
-
-        return augmented_products
-
-    def fetch_product_search_list(self, page, page_size):
+        self._category_prefetch = None
+        if self.plan.categories and self.category_resolver.needs_refresh():
+            self._category_prefetch = self.scheduler.submit(self.category_resolver.load_all)
+
+        search, first_page = self.schedule_product_page(start_page)
+        self._first_page_search = None
+        last_page = search.result()[1]['totalPages']
+        if end_page is not None:
+            last_page = min(last_page, end_page)
+        remaining_pages = self.scheduler.ordered_futures(
+            lambda page: self.schedule_product_page(page)[1],
+            range(start_page + 1, last_page + 1),
+            # One more page than searched concurrently, for the page waiting on its ATP lookup
+            self.max_concurrent_pages + 1)
+
+        try:
+            page = start_page
+            with self.metrics.timed('fetch'):
+                products, page_info = first_page.result()
+            while True:
+                product_page = ProductPage(page, products, page_info)
+                yield self.enrich_page(product_page) if enrich else product_page
+
+                with self.metrics.timed('fetch'):
+                    products, page_info = next(remaining_pages)
+                page += 1
+        except StopIteration:
+            return
+        finally:
+            # Pages yielded without enrichment still need the categories
+            if enrich and self._category_prefetch is not None:
+                self._category_prefetch.cancel()
+            remaining_pages.close()
+
+    def enrich_page(self, page):
+        """ Augment the products of a page with their categories, once the category prefetch is done,
+        and with the specs built from their custom attributes """
+        if len(page.products) == 0 or not (self.plan.categories or self.plan.specs):
+            return page
+
+        products = page.products
+        if self.plan.categories:
+            prefetch = self._category_prefetch
+            if prefetch is not None and not prefetch.cancelled():
+                with self.metrics.timed('fetch'):
+                    prefetch.result()
+
+            with self.metrics.timed('augment'):
+                products = self.augment_product_details(products)
+
+        if self.plan.specs:
+            products = self.augment_product_specs(products)
+
+        return page._replace(products=products)
+
+    def schedule_product_page(self, page):
+        """ Schedule the search request of a page and its ATP lookup.
+        Returns the futures of the search and of the page with inventory """
+        if page == 1 and self._first_page_search is not None:
+            search = Future()
+            search.set_result(self._first_page_search)
+            self._first_page_search = None
+        else:
+            search = self.scheduler.submit(self.search_product_page, page)
+        if self.plan.specs:
+            # The attributes of a page are requested while the page waits for its ATP lookup and categories
+            search.add_done_callback(self.prefetch_attributes)
+        if not self.plan.inventory:
+            return search, search
+
+        return search, self.scheduler.then(search, self.schedule_products_inventory)
+
+    def search_product_page(self, page):
+        with self._page_slots:
+            return self.fetch_product_search_list(page, self.page_size, with_inventory=False)
+
+    def schedule_products_inventory(self, search_result):
+        products, _ = search_result
+        availability = self.atp_batcher.submit([product.get('id') for product in products])
+
+        return self.scheduler.then(
+            availability, lambda products_availability: self.with_products_inventory(search_result, products_availability))
+
+    def with_products_inventory(self, search_result, products_availability):
+        self.apply_products_inventory(search_result[0], products_availability)
+        return search_result
+
+    def prefetch_attributes(self, search):
+        if search.cancelled() or search.exception() is not None:
+            return
+
+        products, _ = search.result()
+        try:
+            self.attribute_resolver.prefetch(
+                key for product in products for key in (product.get('customAttributes') or {}))
+        except RuntimeError:
+            # The scheduler has been shut down while the page was searched
+            pass
+
+    def close(self):
+        self.atp_batcher.flush()
+        self.scheduler.shutdown()
+        self.category_resolver.save()
+        self.attribute_resolver.save()
+
+        # Shared resources are closed by their transport
+        if self.transport is None:
+            self.session.close()
+            if self.response_cache is not None:
+                self.response_cache.save()
+
+    def get(self, endpoint, url):
+        """ GET an Upscale endpoint, serving catalog content from the response cache when it is enabled """
+        if self.response_cache is None or endpoint not in self.CACHEABLE_ENDPOINTS:
+            return self.send(endpoint, url)
+
+        entry = self.response_cache.lookup(url)
+        if entry is not None and self.response_cache.is_fresh(entry, endpoint):
+            cached_response = self.response_cache.load(entry)
+            if cached_response is not None:
+                self.count_cache(endpoint, 'cache_hits')
+                return cached_response
+
+        response = self.send(endpoint, url, headers=entry.conditional_headers() if entry is not None else None)
+        if response.status_code == 304 and entry is not None:
+            cached_response = self.response_cache.load(entry)
+            if cached_response is not None:
+                self.response_cache.revalidated(entry)
+                self.count_cache(endpoint, 'cache_revalidations')
+                return cached_response
+
+            # The body was evicted after the conditional request was sent
+            response = self.send(endpoint, url)
+
+        if response.status_code == 200:
+            self.response_cache.store(endpoint, url, response)
+
+        return response
+
+    def send(self, endpoint, url, headers=None):
+        """ GET an Upscale endpoint through the rate limiter, retrying transient failures.
+        The last response is returned once retries are exhausted, and callers check its status """
+        attempt = 0
+        while True:
+            self.rate_limiter.acquire()
+            try:
+                with self._request_slots:
+                    started_at = time.perf_counter()
+                    response = self.session.get(url, headers=headers, timeout=self.timeouts[endpoint])
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as error:
+                if attempt >= self.max_retries:
+                    raise
+
+                delay = self.backoff(attempt)
+                reason = type(error).__name__
+            else:
+                self.metrics.observe_request(endpoint, time.perf_counter() - started_at, len(response.content))
+                if response.status_code == 429:
+                    self.rate_limiter.throttled(retry_after=parse_retry_after(response))
+                elif response.status_code not in self.RETRY_STATUS_CODES:
+                    self.rate_limiter.succeeded()
+
+                if response.status_code not in self.RETRY_STATUS_CODES or attempt >= self.max_retries:
+                    self.count_request(endpoint)
+                    return response
+
+                delay = max(self.backoff(attempt), parse_retry_after(response) or 0)
+                reason = 'status code {}'.format(response.status_code)
+                response.close()
+
+            attempt += 1
+            self.count_request(endpoint, retried=True)
+            LOGGER.warning('Retrying %s request (attempt %d of %d) in %.2fs after %s',
+                           endpoint, attempt, self.max_retries, delay, reason)
+            time.sleep(delay)
+
+    def backoff(self, attempt):
+        # Full jitter keeps concurrent workers from retrying in lockstep
+        return random.uniform(0, min(self.retry_backoff_max, self.retry_backoff_base * 2 ** attempt))
+
+    def count_request(self, endpoint, retried=False):
+        with self._stats_lock:
+            self.request_stats['requests'] += 1
+            self.request_stats[endpoint] += 1
+            if retried:
+                self.request_stats['retries'] += 1
+
+    def count_cache(self, endpoint, counter):
+        with self._stats_lock:
+            self.request_stats[counter] += 1
+            self.request_stats[endpoint + '_' + counter] += 1
+
+    def stats(self):
+        """ Request counters of this client, including retries and the time spent waiting on the rate limiter """
+        with self._stats_lock:
+            stats = dict(self.request_stats)
+
+        stats['retries'] = stats.get('retries', 0)
+        stats['throttled_responses'] = self.rate_limiter.throttled_responses
+        stats['throttle_time'] = self.rate_limiter.throttle_time
+        stats['rate_limit'] = self.rate_limiter.rate
+        return stats
+
+    def fetch_product_search_list(self, page, page_size, with_inventory=True):
         product_search_url = self.product_search_url.format(self.selling_tree, page, page_size)
         if self.edition_id != None:
             product_search_url += "&editionId=" + self.edition_id
 
-        response = requests.get(product_search_url,
-                                headers={'Accept-Language': 'en-US'},
-                                verify=False,
-                                timeout=10)
+        response = self.get(self.PRODUCT_SEARCH_ENDPOINT, product_search_url)
 
         if response.status_code != 200:
             raise Exception('Failed to fetch product list with status code: {}'.format(response.status_code))
 
-        json_reponse = response.json()
-        products = json_reponse['content']
-        self.fetch_products_inventory(products)
+        products, page_info = parse_product_page(
+            response.content, self.projection, incremental=self.incremental_json_parsing)
+        if with_inventory:
+            self.fetch_products_inventory(products)
 
-        return products, json_reponse['page']
+        return products, page_info
 
     def fetch_products_inventory(self, products):
-        product_ids = ",".join(map(lambda product: product.get('id'), products))
-        products_inventory_url = self.inventory_search_url.format(product_ids)
+        self.apply_products_inventory(products, self.atp_batcher.lookup([product.get('id') for product in products]))
+
+    def fetch_inventory_batch(self, product_ids):
+        products_inventory_url = self.inventory_search_url.format(",".join(product_ids))
 
-        response = requests.get(products_inventory_url,
-                        headers={'Accept-Language': 'en-US'},
-                        verify=False,
-                        timeout=10)
+        with self._atp_slots:
+            response = self.get(self.INVENTORY_SEARCH_ENDPOINT, products_inventory_url)
 
         if response.status_code != 200:
             raise Exception('Failed to fetch products inventory with status code: {}'.format(response.status_code))
@@ -97,7 +449,10 @@ class UpscaleClient:
         for atp in response.json()['atpChecks']:
             product_id = atp.get('productId')
             products_availability[product_id] = atp.get('quantityAvailable')
-        
+
+        return products_availability
+
+    def apply_products_inventory(self, products, products_availability):
         for product in products:
             quantityAvailable = products_availability.get(product.get('id'))
             if quantityAvailable == None:
@@ -128,20 +483,68 @@ class UpscaleClient:
         if self.edition_id != None:
             category_search_url += "&editionId=" + self.edition_id
         
-        response = requests.get(category_search_url, 
-                                headers={'Accept-Language': 'en-US'},
-                                verify=False,
-                                timeout=10)
+        response = self.get(self.CATEGORY_SEARCH_ENDPOINT, category_search_url)
         
         if response.status_code != 200:
             raise Exception('Failed to fetch categories list with status code: {}'.format(response.status_code))
         
         return response.json()
 
-    def augment_product_details(self, products):
+    def fetch_category(self, category_id):
+        """ Fetch a single category, or None when it does not exist """
+        category_url = self.category_url.format(category_id)
+        if self.edition_id != None:
+            category_url += "?editionId=" + self.edition_id
+
+        response = self.get(self.CATEGORY_ENDPOINT, category_url)
+
+        if response.status_code == 404:
+            return None
+
+        if response.status_code != 200:
+            raise Exception('Failed to fetch category with status code: {}'.format(response.status_code))
+
+        return response.json()
+
+    def fetch_custom_attribute(self, attribute_key):
+        """ Fetch the metadata of a custom attribute, or None when it does not exist """
+        custom_attribute_url = self.custom_attribute_url.format(quote(attribute_key, safe=''))
+        if self.edition_id != None:
+            custom_attribute_url += "?editionId=" + self.edition_id
+
+        response = self.get(self.CUSTOM_ATTRIBUTE_ENDPOINT, custom_attribute_url)
+
+        if response.status_code == 404:
+            return None
+
+        if response.status_code != 200:
+            raise Exception('Failed to fetch custom attribute with status code: {}'.format(response.status_code))
+
+        return response.json()
+
+    def augment_product_specs(self, products):
+        """ Attach the custom attributes of every product as specs, together with the attribute metadata.
+        Only the distinct attribute keys of the page are looked up """
+        with self.metrics.timed('fetch'):
+            attributes = self.attribute_resolver.resolve(
+                key for product in products for key in (product.get('customAttributes') or {}))
+
+        with self.metrics.timed('augment'):
+            for product in products:
+                product['specs'] = [dict(attributes.get(key, {}), attributeKey=key, value=value)
+                                    for key, value in (product.get('customAttributes') or {}).items()
+                                    if value is not None]
+
+        return products
+
+    def augment_product_details(self, products, categories=None):
         augmented_products = []
 
-        categories = self.fetch_categories()
+        # Only the categories referenced by these products are resolved
+        if categories is None:
+            categories = self.category_resolver.resolve(
+                category_id for product in products for category_id in product.get('productCategoryIds', [])
+                if category_id != "")
         for product in products:
             product = self.augment_product_categories(product, categories)
             augmented_products.append(product)
@@ -0,0 +1,210 @@
+import threading
+import time
+
+from bisect import bisect_left
+from collections import Counter
+from contextlib import contextmanager
+
+import singer
+
+from singer.metrics import Metric, Point, Tag, log
+
+LOGGER = singer.get_logger()
+
+DEFAULT_INTERVAL = 60
+
+# Upper bounds, in seconds, of the request latency buckets
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+PHASES = ('fetch', 'augment', 'transform', 'validate', 'emit')
+
+
+class LatencyHistogram:
+    """ Latencies of the requests sent to an endpoint, counted in fixed buckets, and the bytes they received """
+
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.bytes = 0
+
+    def observe(self, seconds, size):
+        self.buckets[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.bytes += size
+
+    def percentile(self, fraction):
+        """ Upper bound of the bucket holding the given fraction of the requests, capped by the slowest one """
+        rank = fraction * self.count
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if count > 0 and seen >= rank:
+                return min(LATENCY_BUCKETS[index], self.max) if index < len(LATENCY_BUCKETS) else self.max
+
+        return self.max
+
+
+class SyncMetrics:
+    """ Instrumentation of a sync run: request latency and bytes per endpoint, records per stream,
+    time spent per phase and progress through the catalog.
+
+    Record counts and progress are reported as Singer METRIC messages at most every `interval` seconds,
+    from the thread running the sync, and everything is reported once more as a summary at the end of the run """
+
+    def __init__(self, interval=DEFAULT_INTERVAL, clock=time.perf_counter, logger=LOGGER, tags=None):
+        self.interval = interval
+        # Tags added to every metric, such as the target of a multi-target sync
+        self.tags = tags if tags is not None else {}
+        self.clock = clock
+        self.logger = logger
+
+        self.started_at = clock()
+        self.phases = Counter()
+        self.records = Counter()
+        self.requests = {}
+        self.products_synced = 0
+        self.products_done = 0
+        self.products_total = None
+
+        self._lock = threading.Lock()
+        self._reported_at = self.started_at
+        self._reported_records = Counter()
+
+    @classmethod
+    def from_config(cls, config, tags=None):
+        return cls(interval=float(config.get('metrics_interval', DEFAULT_INTERVAL)), tags=tags)
+
+    def observe_request(self, endpoint, seconds, size):
+        """ Called from the fetch workers for every response received from Upscale """
+        with self._lock:
+            histogram = self.requests.get(endpoint)
+            if histogram is None:
+                histogram = self.requests[endpoint] = LatencyHistogram()
+            histogram.observe(seconds, size)
+
+    def add_time(self, phase, seconds):
+        with self._lock:
+            self.phases[phase] += seconds
+
+    def records_written(self, counts, seconds):
+        """ Called from the emit stage with the records written per stream and the time it took """
+        with self._lock:
+            self.records.update(counts)
+            self.phases['emit'] += seconds
+
+    @contextmanager
+    def timed(self, phase):
+        """ Add the time spent in the block to `phase` """
+        started_at = self.clock()
+        try:
+            yield
+        finally:
+            self.add_time(phase, self.clock() - started_at)
+
+    def page_synced(self, page_number, products, page_info):
+        """ Track the progress through the catalog after a page of products has been synced """
+        self.products_synced += products
+        self.products_total = page_info.get('totalElements')
+        self.products_done = (page_number - 1) * page_info.get('size', 0) + products
+
+        if self.clock() - self._reported_at >= self.interval:
+            self.report()
+
+    def eta(self):
+        """ Seconds left until every product has been synced, at the rate observed so far in this run """
+        elapsed = self.clock() - self.started_at
+        if self.products_total is None or self.products_synced == 0 or elapsed <= 0:
+            return None
+
+        remaining = max(0, self.products_total - self.products_done)
+        return remaining / (self.products_synced / elapsed)
+
+    def report(self):
+        """ Report the records written since the previous report and the progress of the sync """
+        self._reported_at = self.clock()
+
+        # Records are counted by the emit stage while the sync reports
+        with self._lock:
+            records = Counter(self.records)
+
+        for stream, count in records.items():
+            delta = count - self._reported_records[stream]
+            if delta > 0:
+                self._log(Point('counter', Metric.record_count, delta, {Tag.endpoint: stream}))
+        self._reported_records = records
+
+        if self.products_total is not None:
+            eta = self.eta()
+            self._log(Point('counter', 'product_progress', self.products_done, {
+                'total': self.products_total,
+                'eta_seconds': round(eta, 1) if eta is not None else None
+            }))
+            self.logger.info('Synced %d of %d products, %s',
+                             self.products_done, self.products_total,
+                             'about {:.0f}s left'.format(eta) if eta is not None else 'no estimate yet')
+
+    def summary(self):
+        """ Report the totals of the run: records per stream, time per phase and requests per endpoint """
+        self.report()
+        elapsed = self.clock() - self.started_at
+
+        if self.tags:
+            self.logger.info('Summary of %s', ', '.join('{} {}'.format(key, value) for key, value in self.tags.items()))
+
+        with self._lock:
+            records = Counter(self.records)
+            phases = Counter(self.phases)
+            requests = dict(self.requests)
+
+        for stream, count in sorted(records.items()):
+            self.logger.info('Wrote %d %s records (%.1f/s)', count, stream, count / elapsed if elapsed > 0 else 0)
+
+        for phase in PHASES:
+            self._log(Point('timer', 'sync_phase_duration', round(phases[phase], 3), {'phase': phase}))
+        self.logger.info('Time per phase: %s',
+                         ', '.join('{} {:.2f}s'.format(phase, phases[phase]) for phase in PHASES))
+
+        for endpoint, histogram in sorted(requests.items()):
+            self._log(Point('timer', Metric.http_request_duration, round(histogram.total, 3), {
+                Tag.endpoint: endpoint,
+                'requests': histogram.count,
+                'bytes': histogram.bytes,
+                'p50': histogram.percentile(0.5),
+                'p95': histogram.percentile(0.95),
+                'max': round(histogram.max, 3)
+            }))
+            self.logger.info('%s: %d requests, %d bytes, p50 %.3fs, p95 %.3fs, max %.3fs',
+                             endpoint, histogram.count, histogram.bytes,
+                             histogram.percentile(0.5), histogram.percentile(0.95), histogram.max)
+
+    def _log(self, point):
+        log(self.logger, point._replace(tags=dict(self.tags, **point.tags)) if self.tags else point)
+
+
+class MeteredWriter:
+    """ Wraps a writer to count the records written per stream and the time spent writing them """
+
+    def __init__(self, writer, metrics):
+        self.writer = writer
+        self.metrics = metrics
+
+    def write_record(self, stream, record):
+        started_at = self.metrics.clock()
+        self.writer.write_record(stream, record)
+        self.metrics.records_written({stream: 1}, self.metrics.clock() - started_at)
+
+    def write_records(self, records):
+        """ Write a batch of (stream, record) pairs, timed and counted as a whole """
+        started_at = self.metrics.clock()
+        counts = Counter()
+        for stream, record in records:
+            self.writer.write_record(stream, record)
+            counts[stream] += 1
+        self.metrics.records_written(counts, self.metrics.clock() - started_at)
+
+    def __getattr__(self, name):
+        return getattr(self.writer, name)
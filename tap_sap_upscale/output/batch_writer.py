@@ -0,0 +1,129 @@
+import gzip
+import os
+import threading
+import uuid
+
+from tap_sap_upscale.output.writer import dumps
+
+DEFAULT_ROWS_PER_FILE = 100000
+DEFAULT_ROWS_PER_STATE = 10000
+COMPRESS_LEVEL = 6
+
+
+class BatchFile:
+    def __init__(self, path):
+        self.path = path
+        self.rows = 0
+        self._file = gzip.open(path, 'wb', compresslevel=COMPRESS_LEVEL)
+
+    def write(self, line):
+        self._file.write(line)
+        self.rows += 1
+
+    def close(self):
+        self._file.close()
+
+
+class BatchWriter:
+    """ Writes the records of every stream to rotating gzip-compressed JSONL files, and only emits Singer
+    BATCH messages pointing to them, so targets can bulk-load files instead of parsing records one by one.
+
+    SCHEMA and STATE messages still go through `writer`. A STATE message is held while fewer than
+    `rows_per_state` rows were written since the last one, so files are not cut at every checkpoint. Once a file
+    is full or enough rows were written, every open file is completed and announced before the latest state is
+    written, so a state never covers records the target has not been told about """
+
+    ENCODING = {'format': 'jsonl', 'compression': 'gzip'}
+
+    def __init__(self, writer, directory, rows_per_file=DEFAULT_ROWS_PER_FILE, rows_per_state=DEFAULT_ROWS_PER_STATE):
+        self.writer = writer
+        self.directory = os.path.abspath(directory)
+        self.rows_per_file = rows_per_file
+        self.rows_per_state = rows_per_state
+
+        self._run_id = uuid.uuid4().hex
+        self._sequence = 0
+        self._files = {}
+        self._pending_state = None
+        self._rows_since_state = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(self.directory, exist_ok=True)
+
+    @classmethod
+    def from_config(cls, config, writer):
+        return cls(writer,
+                   config.get('batch_dir', 'batches'),
+                   rows_per_file=int(config.get('batch_rows_per_file', DEFAULT_ROWS_PER_FILE)),
+                   rows_per_state=int(config.get('batch_rows_per_state', DEFAULT_ROWS_PER_STATE)))
+
+    def write_schema(self, stream, schema, key_properties):
+        self.writer.write_schema(stream, schema, key_properties)
+
+    def write_record(self, stream, record):
+        line = dumps(record) + b'\n'
+        with self._lock:
+            batch_file = self._files.get(stream)
+            if batch_file is None:
+                batch_file = self._files[stream] = self._open(stream)
+
+            batch_file.write(line)
+            self._rows_since_state += 1
+            if batch_file.rows >= self.rows_per_file:
+                if self._pending_state is not None:
+                    self._complete_files()
+                else:
+                    del self._files[stream]
+                    self._complete(stream, batch_file)
+
+    def write_state(self, value):
+        # Serialized right away, as the state keeps changing until it is written
+        self.write_serialized_state(dumps(value))
+
+    def write_serialized_state(self, value):
+        with self._lock:
+            self._pending_state = value
+            # Without open files the state only covers announced records
+            if not self._files or self._rows_since_state >= self.rows_per_state:
+                self._complete_files()
+
+    def write_message(self, message):
+        self.writer.write_message(message)
+
+    def complete_files(self):
+        with self._lock:
+            self._complete_files()
+
+    def flush(self):
+        self.writer.flush()
+
+    def close(self):
+        self.complete_files()
+        self.writer.close()
+
+    def _complete_files(self):
+        """ Complete and announce every open file, then write the state held until then """
+        files = self._files
+        self._files = {}
+
+        for stream, batch_file in files.items():
+            self._complete(stream, batch_file)
+
+        if self._pending_state is not None:
+            self.writer.write_serialized_state(self._pending_state)
+            self._pending_state = None
+            self._rows_since_state = 0
+
+    def _open(self, stream):
+        self._sequence += 1
+        filename = '{}-{}-{:05d}.jsonl.gz'.format(stream, self._run_id, self._sequence)
+        return BatchFile(os.path.join(self.directory, filename))
+
+    def _complete(self, stream, batch_file):
+        batch_file.close()
+        self.writer.write_message({
+            'type': 'BATCH',
+            'stream': stream,
+            'encoding': self.ENCODING,
+            'manifest': ['file://' + batch_file.path]
+        })
@@ -0,0 +1,213 @@
+import re
+import threading
+
+from collections import Counter
+from functools import lru_cache
+
+import singer
+
+from tap_sap_upscale.output.writer import dumps
+
+LOGGER = singer.get_logger()
+
+MODES = ('warn', 'quarantine', 'fail')
+DEFAULT_QUARANTINE_PATH = 'quarantine.jsonl'
+
+# Violations logged per stream in warn mode, the others are only counted
+LOGGED_VIOLATIONS = 10
+
+# Python types of the JSON schema types. bool is not an int here, as JSON booleans are not numbers
+JSON_TYPES = {
+    'null': (type(None),),
+    'boolean': (bool,),
+    'integer': (int,),
+    'number': (int, float),
+    'string': (str,),
+    'object': (dict,),
+    'array': (list, tuple)
+}
+
+DATE_TIME = re.compile(r'\d{4}-\d{2}-\d{2}[Tt ]\d{2}:\d{2}:\d{2}(\.\d+)?([Zz]|[+-]\d{2}:?\d{2})?')
+
+
+@lru_cache(maxsize=1024)
+def is_date_time(value):
+    """ Memoized, as the points of a run all share the run timestamp """
+    return DATE_TIME.fullmatch(value) is not None
+
+# Marks properties which are not in the schema
+UNKNOWN = object()
+UNKNOWN_PROPERTY = (UNKNOWN, None, None)
+
+
+def matches_type(value, types):
+    """ Slow path of the type check, for subclasses of the JSON types and integral floats """
+    for name in types:
+        if name == 'integer' and isinstance(value, float) and value.is_integer():
+            return True
+        if not isinstance(value, bool) and isinstance(value, JSON_TYPES.get(name, ())) \
+                or name == 'boolean' and isinstance(value, bool):
+            return True
+
+    return False
+
+
+class SchemaValidator:
+    """ A JSON schema compiled once into lookup tables, so a value is checked without walking the schema.
+
+    Supports what the stream schemas use: `type`, `properties`, `additionalProperties`, `required`, `items`
+    and the `date-time` format. Properties holding a plain type are checked with a single set lookup,
+    and only the properties needing more than a type check are walked into """
+
+    def __init__(self, schema):
+        types = schema.get('type')
+        self.types = [types] if isinstance(types, str) else types
+        self.exact_types = frozenset(python_type for name in self.types or [] for python_type in JSON_TYPES[name])
+        self.date_time = schema.get('format') == 'date-time'
+        self.items = SchemaValidator(schema['items']) if isinstance(schema.get('items'), dict) else None
+        self.required = schema.get('required', [])
+        self.additional_properties = schema.get('additionalProperties', True) is not False
+
+        # Every property maps to its exact and JSON types, and to a validator when a type check is not enough
+        self.properties = {}
+        for key, property_schema in schema.get('properties', {}).items():
+            validator = SchemaValidator(property_schema)
+            self.properties[key] = (validator.exact_types, validator.types,
+                                    validator if validator.is_nested() else None)
+
+    def is_nested(self):
+        return self.date_time or self.items is not None or bool(self.properties) or bool(self.required) \
+            or not self.additional_properties
+
+    def is_valid(self, value):
+        return not self.errors(value)
+
+    def errors(self, value, path='record'):
+        """ Return the violations of a value as messages, or an empty list """
+        errors = []
+        self._check(value, path, errors)
+        return errors
+
+    def _check(self, value, path, errors):
+        if self.types is not None and type(value) not in self.exact_types and not matches_type(value, self.types):
+            errors.append('{} is {}, expected {}'.format(path, type(value).__name__, ' or '.join(self.types)))
+            return
+
+        if self.date_time and isinstance(value, str) and not is_date_time(value):
+            errors.append('{} is not a date-time: {}'.format(path, value))
+
+        if isinstance(value, dict):
+            self._check_properties(value, path, errors)
+        elif self.items is not None and isinstance(value, (list, tuple)):
+            for index, item in enumerate(value):
+                self.items._check(item, '{}[{}]'.format(path, index), errors)
+
+    def _check_properties(self, value, path, errors):
+        properties = self.properties
+        for key, item in value.items():
+            exact_types, types, validator = properties.get(key, UNKNOWN_PROPERTY)
+            if exact_types is UNKNOWN:
+                if not self.additional_properties:
+                    errors.append('{}.{} is not in the schema'.format(path, key))
+                continue
+
+            if validator is not None:
+                validator._check(item, '{}.{}'.format(path, key), errors)
+            elif types is not None and type(item) not in exact_types and not matches_type(item, types):
+                errors.append('{}.{} is {}, expected {}'.format(path, key, type(item).__name__, ' or '.join(types)))
+
+        for key in self.required:
+            if key not in value:
+                errors.append('{}.{} is missing'.format(path, key))
+
+
+class RecordValidator:
+    """ Validates records against the schemas of their stream, compiled once per run.
+
+    In `warn` mode violations are logged and records still written, in `quarantine` mode invalid records
+    are appended to a JSONL file instead of being written, and in `fail` mode the sync fails """
+
+    def __init__(self, schemas, mode='warn', quarantine_path=DEFAULT_QUARANTINE_PATH):
+        if mode not in MODES:
+            raise Exception('Invalid validate_records mode {}, expected one of {}'.format(mode, ', '.join(MODES)))
+
+        self.validators = {stream: SchemaValidator(schema) for stream, schema in schemas.items()}
+        self.mode = mode
+        self.quarantine_path = quarantine_path
+        self.violations = Counter()
+
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config, schemas):
+        mode = config.get('validate_records')
+        if not mode:
+            return None
+
+        return cls(schemas, mode='warn' if mode is True else mode,
+                   quarantine_path=config.get('quarantine_path', DEFAULT_QUARANTINE_PATH))
+
+    def validate(self, records):
+        """ Check a batch of (stream, record) pairs. Returns the pairs to write """
+        invalid = []
+        validators = self.validators
+        for index, (stream, record) in enumerate(records):
+            validator = validators.get(stream)
+            if validator is not None:
+                errors = validator.errors(record)
+                if errors:
+                    invalid.append((index, stream, record, errors))
+
+        if not invalid:
+            return records
+
+        self.rejected(invalid)
+        if self.mode != 'quarantine':
+            return records
+
+        invalid_indexes = {index for index, _, _, _ in invalid}
+        return [pair for index, pair in enumerate(records) if index not in invalid_indexes]
+
+    def rejected(self, invalid):
+        with self._lock:
+            for _, stream, record, errors in invalid:
+                self.violations[stream] += 1
+                if self.mode == 'fail':
+                    raise Exception('Invalid {} record: {}'.format(stream, '; '.join(errors)))
+                if self.mode == 'warn' and self.violations[stream] <= LOGGED_VIOLATIONS:
+                    LOGGER.warning('Invalid %s record %s: %s', stream, record, '; '.join(errors))
+
+            if self.mode == 'quarantine':
+                with open(self.quarantine_path, 'ab') as file:
+                    file.write(b''.join(dumps({'stream': stream, 'record': record, 'errors': errors}) + b'\n'
+                                        for _, stream, record, errors in invalid))
+
+    def summary(self):
+        for stream, count in sorted(self.violations.items()):
+            LOGGER.warning('%d %s records violated the schema%s', count, stream,
+                           ', quarantined to ' + self.quarantine_path if self.mode == 'quarantine' else '')
+
+
+class ValidatingWriter:
+    """ Wraps a writer to validate batches of records before they are written """
+
+    def __init__(self, writer, validator, metrics=None):
+        self.writer = writer
+        self.validator = validator
+        self.metrics = metrics
+
+    def write_records(self, records):
+        if self.metrics is None:
+            self.writer.write_records(self.validator.validate(records))
+            return
+
+        started_at = self.metrics.clock()
+        records = self.validator.validate(records)
+        self.metrics.add_time('validate', self.metrics.clock() - started_at)
+        self.writer.write_records(records)
+
+    def write_record(self, stream, record):
+        self.write_records([(stream, record)])
+
+    def __getattr__(self, name):
+        return getattr(self.writer, name)
@@ -0,0 +1,101 @@
+import json
+import sys
+import threading
+import time
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+DEFAULT_BUFFER_BYTES = 1024 * 1024
+DEFAULT_FLUSH_INTERVAL = 1.0
+
+
+def dumps(value):
+    """ Serialize a value to compact JSON bytes, with orjson when it is installed """
+    if orjson is not None:
+        return orjson.dumps(value)
+
+    return json.dumps(value, separators=(',', ':'), allow_nan=False).encode('utf-8')
+
+
+class RecordWriter:
+    """ Writes Singer messages to stdout through a large buffer.
+
+    RECORD messages are assembled from a serialized envelope prefix cached per stream, so only the record
+    itself is serialized for every message. The buffer is flushed once it holds `buffer_bytes`, when
+    `flush_interval` seconds passed since the last flush, and always right after a STATE message """
+
+    def __init__(self, output=None, buffer_bytes=DEFAULT_BUFFER_BYTES, flush_interval=DEFAULT_FLUSH_INTERVAL):
+        output = output if output is not None else sys.stdout
+        output.flush()
+
+        # Text streams without an underlying binary buffer, such as io.StringIO, get decoded messages
+        if hasattr(output, 'buffer'):
+            self._output = output.buffer
+            self._write = output.buffer.write
+        else:
+            self._output = output
+            self._write = lambda message: output.write(message.decode('utf-8'))
+
+        self.buffer_bytes = buffer_bytes
+        self.flush_interval = flush_interval
+
+        self._buffer = bytearray()
+        self._envelopes = {}
+        self._flushed_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config, output=None):
+        return cls(output,
+                   buffer_bytes=int(config.get('output_buffer_bytes', DEFAULT_BUFFER_BYTES)),
+                   flush_interval=float(config.get('output_flush_interval', DEFAULT_FLUSH_INTERVAL)))
+
+    def write_schema(self, stream, schema, key_properties):
+        self.write_message({
+            'type': 'SCHEMA',
+            'stream': stream,
+            'schema': schema,
+            'key_properties': key_properties
+        })
+
+    def write_record(self, stream, record):
+        envelope = self._envelopes.get(stream)
+        if envelope is None:
+            envelope = self._envelopes[stream] = b'{"type":"RECORD","stream":' + dumps(stream) + b',"record":'
+
+        self._append(envelope + dumps(record) + b'}\n')
+
+    def write_state(self, value):
+        self.write_serialized_state(dumps(value))
+
+    def write_serialized_state(self, value):
+        """ Write a STATE message whose value is already serialized """
+        self._append(b'{"type":"STATE","value":' + value + b'}\n', flush=True)
+
+    def write_message(self, message):
+        self._append(dumps(message) + b'\n')
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def close(self):
+        self.flush()
+
+    def _append(self, message, flush=False):
+        with self._lock:
+            self._buffer += message
+            if flush or len(self._buffer) >= self.buffer_bytes \
+                    or time.monotonic() - self._flushed_at >= self.flush_interval:
+                self._flush()
+
+    def _flush(self):
+        if self._buffer:
+            self._write(self._buffer)
+            self._buffer = bytearray()
+
+        self._output.flush()
+        self._flushed_at = time.monotonic()
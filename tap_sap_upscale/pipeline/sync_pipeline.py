@@ -0,0 +1,193 @@
+import queue
+import threading
+
+DEFAULT_ENRICH_WORKERS = 2
+DEFAULT_QUEUE_SIZE = 4
+
+# Marks the end of the items put on a queue
+END = object()
+
+
+class PipelineStopped(Exception):
+    """ Raised in a stage when another stage failed """
+
+
+class StageWriter:
+    """ Writer handed to the transform stage. Records are collected per page and passed on to the emit stage.
+
+    A STATE message waits until the emit stage wrote it, so the state can't be changed by later pages
+    before it is serialized. Once the pipeline is done, messages go straight to the writer """
+
+    def __init__(self, pipeline):
+        self.pipeline = pipeline
+        self._records = []
+
+    def write_record(self, stream, record):
+        self._records.append((stream, record))
+
+    def write_state(self, value):
+        if not self.pipeline.running:
+            self.pipeline.writer.write_state(value)
+            return
+
+        self.end_page()
+        written = threading.Event()
+        self.pipeline.put(self.pipeline.emit_queue, ('state', value, written))
+        while not written.wait(0.1):
+            self.pipeline.check()
+
+    def end_page(self):
+        if self._records:
+            self.pipeline.put(self.pipeline.emit_queue, ('records', self._records, None))
+            self._records = []
+
+
+class SyncPipeline:
+    """ Syncs product pages through stages running in their own threads, connected by bounded queues:
+    fetch, enrichment with categories, transformation into records, and output.
+
+    Network waits, transformation and serialization overlap, and when the target reads stdout slowly the
+    full queues hold back the upstream stages, so memory stays bounded by the queue sizes.
+    Enrichment can run on several workers. Pages are transformed in page order by a single worker,
+    as the record handlers assign ids in order, and written by a single worker """
+
+    def __init__(self, writer, enrich_workers=DEFAULT_ENRICH_WORKERS, queue_size=DEFAULT_QUEUE_SIZE):
+        self.writer = writer
+        self.enrich_workers = enrich_workers
+        self.output = StageWriter(self)
+        self.running = False
+
+        self.enrich_queue = queue.Queue(queue_size)
+        self.transform_queue = queue.Queue(queue_size)
+        self.emit_queue = queue.Queue(queue_size)
+
+        # Pages enriched out of order wait for their turn in the transform stage, within this bound
+        self._pages_in_flight = threading.BoundedSemaphore(2 * queue_size + enrich_workers)
+
+        self._stopped = threading.Event()
+        self._errors = []
+        self._lock = threading.Lock()
+        self._enrich_workers_left = enrich_workers
+
+    @classmethod
+    def from_config(cls, config, writer):
+        return cls(writer,
+                   enrich_workers=int(config.get('pipeline_enrich_workers', DEFAULT_ENRICH_WORKERS)),
+                   queue_size=int(config.get('pipeline_queue_size', DEFAULT_QUEUE_SIZE)))
+
+    def run(self, pages, enrich, transform):
+        """ Run `enrich` and `transform` over the pages of the `pages` iterator, until every page was written.
+        `transform` is called with each page in order and writes its records through `self.output` """
+        threads = [threading.Thread(target=self._stage, args=(self._fetch, pages), name='pipeline-fetch')]
+        threads.extend(threading.Thread(target=self._stage, args=(self._enrich, enrich),
+                                        name='pipeline-enrich-{}'.format(worker))
+                       for worker in range(self.enrich_workers))
+        threads.append(threading.Thread(target=self._stage, args=(self._emit,), name='pipeline-emit'))
+
+        self.running = True
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+
+        # The transform stage runs on the calling thread, which owns the record handlers
+        self._stage(self._transform, transform)
+        for thread in threads:
+            thread.join()
+        self.running = False
+
+        if self._errors:
+            raise self._errors[0]
+
+    def put(self, target, item):
+        while True:
+            self.check()
+            try:
+                target.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def get(self, source):
+        while True:
+            self.check()
+            try:
+                return source.get(timeout=0.1)
+            except queue.Empty:
+                pass
+
+    def acquire(self, semaphore):
+        while not semaphore.acquire(timeout=0.1):
+            self.check()
+
+    def check(self):
+        if self._stopped.is_set():
+            raise PipelineStopped()
+
+    def _stage(self, stage, *args):
+        try:
+            stage(*args)
+        except PipelineStopped:
+            pass
+        except BaseException as error:
+            with self._lock:
+                self._errors.append(error)
+            self._stopped.set()
+
+    def _fetch(self, pages):
+        try:
+            for index, page in enumerate(pages):
+                self.acquire(self._pages_in_flight)
+                self.put(self.enrich_queue, (index, page))
+        finally:
+            if hasattr(pages, 'close'):
+                pages.close()
+
+        self.put(self.enrich_queue, END)
+
+    def _enrich(self, enrich):
+        while True:
+            item = self.get(self.enrich_queue)
+            if item is END:
+                # Let the other enrichment workers see the end too, and the last one tells the transform stage
+                self.put(self.enrich_queue, END)
+                with self._lock:
+                    self._enrich_workers_left -= 1
+                    last = self._enrich_workers_left == 0
+                if last:
+                    self.put(self.transform_queue, END)
+                return
+
+            index, page = item
+            self.put(self.transform_queue, (index, enrich(page)))
+
+    def _transform(self, transform):
+        # Enrichment workers may finish pages out of order
+        pending = {}
+        next_index = 0
+        while True:
+            item = self.get(self.transform_queue)
+            if item is END:
+                break
+
+            index, page = item
+            pending[index] = page
+            while next_index in pending:
+                transform(pending.pop(next_index))
+                self.output.end_page()
+                self._pages_in_flight.release()
+                next_index += 1
+
+        self.put(self.emit_queue, END)
+
+    def _emit(self):
+        while True:
+            item = self.get(self.emit_queue)
+            if item is END:
+                return
+
+            kind, value, written = item
+            if kind == 'records':
+                self.writer.write_records(value)
+            else:
+                self.writer.write_state(value)
+                written.set()
@@ -0,0 +1,13 @@
+class RecordContext:
+    """ Values shared by every record generated during a run, passed to `BaseHandler.generate_batch` """
+
+    def __init__(self, tenant_id, timestamp=None, config=None, target=None):
+        self.tenant_id = tenant_id
+        self.timestamp = timestamp
+        self.config = config if config is not None else {}
+        # Key of the target being synced, each target having its own handler instances
+        self.target = target
+
+    def options(self):
+        """ The context as the keyword options of `BaseHandler.generate` """
+        return {'tenant_id': self.tenant_id, 'timestamp': self.timestamp, 'config': self.config}
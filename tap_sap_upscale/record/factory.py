@@ -9,35 +9,18 @@ from tap_sap_upscale.record.handler.spec_handler import SpecHandler
 from tap_sap_upscale.record.handler.stock_point_handler import StockPointHandler
 
 
-def build_record_handler(record: Record):
-    if record == Record.CATEGORY:
-        # pylint: disable=no-member
-        return CategoryHandler.get_instance()
-
-    if record == Record.CUSTOMER_SPECIFIC_PRICE:
-        # pylint: disable=no-member
-        return CustomerSpecificPriceHandler.get_instance()
-
-    if record == Record.PRICE_POINT:
-        # pylint: disable=no-member
-        return PricePointHandler.get_instance()
-
-    if record == Record.PRODUCT:
-        # pylint: disable=no-member
-        return ProductHandler.get_instance()
-
-    if record == Record.PRODUCT_SPEC:
-        # pylint: disable=no-member
-        return ProductSpecHandler.get_instance()
-
-    if record == Record.CATEGORY_PRODUCT:
-        # pylint: disable=no-member
-        return CategoryProductHandler.get_instance()
-
-    if record == Record.SPEC:
-        # pylint: disable=no-member
-        return SpecHandler.get_instance()
-
-    if record == Record.STOCK_POINT:
-        # pylint: disable=no-member
-        return StockPointHandler.get_instance()
\ No newline at end of file
+RECORD_HANDLERS = {
+    Record.CATEGORY: CategoryHandler,
+    Record.CUSTOMER_SPECIFIC_PRICE: CustomerSpecificPriceHandler,
+    Record.PRICE_POINT: PricePointHandler,
+    Record.PRODUCT: ProductHandler,
+    Record.PRODUCT_SPEC: ProductSpecHandler,
+    Record.CATEGORY_PRODUCT: CategoryProductHandler,
+    Record.SPEC: SpecHandler,
+    Record.STOCK_POINT: StockPointHandler
+}
+
+
+def build_record_handler(record: Record, target=None):
+    # pylint: disable=no-member
+    return RECORD_HANDLERS[record].get_instance(target)
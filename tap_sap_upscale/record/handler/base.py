@@ -2,7 +2,24 @@ from abc import abstractmethod
 
 
 class BaseHandler:
+    _context = None
 
     @abstractmethod
     def generate(self, record, **options):
         pass
+
+    def generate_batch(self, records, context):
+        """ Generate the records of many source records sharing the same context """
+        if context is not self._context:
+            self._context = context
+            self.prepare(context)
+
+        return self.generate_prepared(records, context)
+
+    def prepare(self, context):
+        """ Precompute the values derived from the context, once per run """
+        pass
+
+    def generate_prepared(self, records, context):
+        options = context.options()
+        return [self.generate(record, **options) for record in records]
@@ -1,22 +1,32 @@
 from tap_sap_upscale.record.handler.base import BaseHandler
 from tap_sap_upscale.record.handler.decorators import Singleton
+from tap_sap_upscale.state.id_map import IdMap
 
 
 @Singleton
 class CategoryHandler(BaseHandler):
-    _handled_categories = {}
-    _code = 0
+
+    def __init__(self):
+        self._ids = IdMap()
+        self._handled_categories = set()
+
+    def load_ids(self, ids: IdMap):
+        """ Reuse the category ids generated by previous syncs """
+        self._ids = ids
+        self._handled_categories = set()
+
+    def assign_ids(self, category_ids, prefix):
+        """ Generate the ids of categories up front, in the given order instead of the order products reference them """
+        self._ids.assign_all(category_ids, prefix)
 
     def generate(self, category, **options):
         category_id = category.get('id')
 
         if category_id in self._handled_categories:
-            return self._handled_categories.get(category_id)
-
-        self._code += 1
-        generated_category_id = options.get('tenant_id') + str(self._code)
+            return self._ids.get(category_id)
 
-        self._handled_categories[category_id] = generated_category_id
+        self._handled_categories.add(category_id)
+        generated_category_id = self._ids.assign(category_id, options.get('tenant_id'))
 
         return {
             'id': generated_category_id,
@@ -9,4 +9,12 @@ class CategoryProductHandler(BaseHandler):
             'tenantId': options.get('tenant_id'),
             'sku': options.get('sku'),
             'categoryId': options.get('category_id')
-        } 
\ No newline at end of file
+        }
+
+    def generate_prepared(self, assignments, context):
+        """ Assignments are (sku, category id) pairs """
+        return [{
+            'tenantId': context.tenant_id,
+            'sku': sku,
+            'categoryId': category_id
+        } for sku, category_id in assignments]
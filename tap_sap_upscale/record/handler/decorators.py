@@ -1,16 +1,25 @@
+import threading
+
+
 class Singleton:
     def __init__(self, decorated):
         self._decorated = decorated
-        self._instance = None
+        self._instances = {}
+        self._lock = threading.Lock()
 
-    def get_instance(self):
-        if not self._instance:
-            self._instance = self._decorated()
+    def get_instance(self, key=None):
+        """ One instance per key, so targets synced in the same process don't share handler state """
+        instance = self._instances.get(key)
+        if instance is None:
+            with self._lock:
+                instance = self._instances.get(key)
+                if instance is None:
+                    instance = self._instances[key] = self._decorated()
 
-        return self._instance
+        return instance
 
     def __call__(self):
         raise TypeError('Singletons must be accessed through `get_instance()`.')
 
     def __instancecheck__(self, inst):
-        return isinstance(inst, self._decorated)
\ No newline at end of file
+        return isinstance(inst, self._decorated)
@@ -5,6 +5,7 @@ from tap_sap_upscale.record.handler.decorators import Singleton
 @Singleton
 class PricePointHandler(BaseHandler):
     _counter = 0
+    _id_prefix = None
 
     def generate(self, product, **options):
         self._counter += 1
@@ -16,3 +17,24 @@ class PricePointHandler(BaseHandler):
             'timestamp': options.get('timestamp'),
             'price': product.get('price', {}).get('sellingPrice')
         }
+
+    def seek(self, counter):
+        """ Continue the ids of the points from `counter` """
+        self._counter = counter
+
+    def prepare(self, context):
+        self._id_prefix = "{}.".format(context.timestamp)
+
+    def generate_prepared(self, products, context):
+        records = []
+        for product in products:
+            self._counter += 1
+            records.append({
+                'id': self._id_prefix + str(self._counter),
+                'tenantId': context.tenant_id,
+                'sku': product.get('sku'),
+                'timestamp': context.timestamp,
+                'price': product.get('price', {}).get('sellingPrice')
+            })
+
+        return records
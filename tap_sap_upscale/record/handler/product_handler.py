@@ -4,22 +4,34 @@ from tap_sap_upscale.record.handler.base import BaseHandler
 from tap_sap_upscale.record.handler.decorators import Singleton
 
 def get_images(product):
-    links = ""
-    if len(product.get('media', [])) > 0:
-        for i in range(len(product.get('media', []))):
-            links += product.get('media')[i]['fullSize'] + " | "
-            #links.append(product.get('media')[i]['fullSize'])
+    return ' | '.join(media['fullSize'] for media in product.get('media') or [])
 
-    return links[:-2]
+
+def get_details_uri_prefix(config):
+    return urlunparse((config.get('ui_scheme'), config.get('ui_base_url'), '/product/', None, None, None))
 
 
 @Singleton
 class ProductHandler(BaseHandler):
+    _details_uri_prefix = None
 
     def generate(self, product, **options):
+        return self.build(product, options.get('tenant_id'), get_details_uri_prefix(options.get('config')))
+
+    def prepare(self, context):
+        self._details_uri_prefix = get_details_uri_prefix(context.config)
+
+    def generate_prepared(self, products, context):
+        tenant_id = context.tenant_id
+        details_uri_prefix = self._details_uri_prefix
+        return [self.build(product, tenant_id, details_uri_prefix) for product in products]
+
+    def build(self, product, tenant_id, details_uri_prefix):
+        media = product.get('media') or []
+
         return {
             'sku': product.get('id'),   
-            'tenantId': options.get('tenant_id'),
+            'tenantId': tenant_id,
             # Currently, we don't consider variants and their potential surcharge. 
             'regularPrice': product.get('price', {}).get('sellingPrice'),
             'salePrice': None,
@@ -31,23 +43,13 @@ class ProductHandler(BaseHandler):
             'stock': None,
 
             # There can be more than one images. Shouldn't we change this in the schema?  
-            'imageUri':
-                product.get('media')[0]['fullSize']
-                if len(product.get('media', [])) > 0 and product.get('media')[0].get('fullSize') is not None
-                else None,
-            'detailsUri': urlunparse((
-                options.get('config').get('ui_scheme'),
-                options.get('config').get('ui_base_url'),
-                '/product/' + product.get('id'),
-                None,
-                None,
-                None
-            )),
+            'imageUri': media[0].get('fullSize') if len(media) > 0 else None,
+            'detailsUri': details_uri_prefix + product.get('id'),
             'name': product.get('name'),
             'description': product.get('description'),
             'summary': None,
             'manufacturer': None,
             'reviewAverage': None,
             'reviewCount': None,
-            'images': get_images(product)#product.get('media')[0]['fullSize']
-        }
\ No newline at end of file
+            'images': get_images(product)
+        }
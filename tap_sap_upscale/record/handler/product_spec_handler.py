@@ -1,3 +1,5 @@
+import json
+
 from tap_sap_upscale.record.handler.base import BaseHandler
 from tap_sap_upscale.record.handler.decorators import Singleton
 
@@ -6,20 +8,29 @@ from tap_sap_upscale.record.handler.decorators import Singleton
 class ProductSpecHandler(BaseHandler):
 
     def generate(self, spec, **options):
+        value = self.to_text(spec.get('value'))
+
         return {
             'tenantId': options.get('tenant_id'),
             'sku': options.get('sku'),
-            # 'specId': options.get('spec_id'), # For now specs are not generated
-            'value': spec.get('value'),
-            'pureValue': spec.get('value') if self.is_numeric(spec.get('value')) else None,
+            'specId': options.get('spec_id'),
+            'value': value,
+            'pureValue': value if self.is_numeric(value) else None,
             'type': None,
             'interpretedType': None,
             'interpretedValue': None
         }
 
+    def to_text(self, value):
+        """ Custom attribute values are not always strings, while the value of a product spec is """
+        if value is None or isinstance(value, str):
+            return value
+
+        return json.dumps(value, sort_keys=True)
+
     def is_numeric(self, value):
         try:
             float(value)
             return True
-        except ValueError:
+        except (TypeError, ValueError):
             return False
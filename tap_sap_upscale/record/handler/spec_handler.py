@@ -1,22 +1,34 @@
 from tap_sap_upscale.record.handler.base import BaseHandler
 from tap_sap_upscale.record.handler.decorators import Singleton
+from tap_sap_upscale.state.id_map import IdMap
 
 
 @Singleton
 class SpecHandler(BaseHandler):
-    _handled_codes = {}
-    _code = 0
+
+    def __init__(self):
+        self._ids = IdMap()
+        self._handled_codes = set()
+        self._keyed = False
+
+    def load_ids(self, ids: IdMap, keyed=False):
+        """ Reuse the spec ids generated by previous syncs. With `keyed`, new ids are built from the attribute key
+        instead of a code, so they don't depend on the order specs are met in """
+        self._ids = ids
+        self._handled_codes = set()
+        self._keyed = keyed
 
     def generate(self, spec, **options):
         attribute_key = spec.get('attributeKey')
 
         if attribute_key in self._handled_codes:
-            return self._handled_codes.get(attribute_key)
-
-        self._code += 1
-        spec_id = options.get('tenant_id') + str(self._code)
+            return self._ids.get(attribute_key)
 
-        self._handled_codes[attribute_key] = spec_id
+        self._handled_codes.add(attribute_key)
+        if self._keyed:
+            spec_id = self._ids.assign_id(attribute_key, '{}.{}'.format(options.get('tenant_id'), attribute_key))
+        else:
+            spec_id = self._ids.assign(attribute_key, options.get('tenant_id'))
 
         return {
             'id': spec_id,
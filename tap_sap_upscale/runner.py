@@ -0,0 +1,338 @@
+import re
+
+import singer
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from singer import utils
+
+from tap_sap_upscale.record.factory import build_record_handler
+from tap_sap_upscale.record.context import RecordContext
+from tap_sap_upscale.record.record import Record
+from tap_sap_upscale.client.fetch_plan import FetchPlan
+from tap_sap_upscale.client.product_projection import ProductProjection
+from tap_sap_upscale.client.session import SharedTransport
+from tap_sap_upscale.client.shard import Shard
+from tap_sap_upscale.client.upscale_client import UpscaleClient
+from tap_sap_upscale.metrics.sync_metrics import MeteredWriter, SyncMetrics
+from tap_sap_upscale.output.batch_writer import BatchWriter
+from tap_sap_upscale.output.record_validator import RecordValidator, ValidatingWriter
+from tap_sap_upscale.output.writer import RecordWriter
+from tap_sap_upscale.pipeline.sync_pipeline import SyncPipeline
+from tap_sap_upscale.state.bookmarks import PageBookmark
+from tap_sap_upscale.state.fingerprints import RecordFingerprints
+from tap_sap_upscale.state.id_map import IdMap
+from tap_sap_upscale.state.point_tracker import PointTracker
+from tap_sap_upscale.state.target_states import TargetStates, TargetWriter
+
+DEFAULT_MAX_CONCURRENT_TARGETS = 4
+
+LOGGER = singer.get_logger()
+
+
+def sync(config, state, catalog):
+    LOGGER.setLevel(config.get('log_level', 'INFO').upper())
+    LOGGER.info('Syncing selected streams')
+    state = state or {}
+
+    # Every message goes through a buffered writer instead of being flushed to stdout one by one
+    writer = RecordWriter.from_config(config)
+    if config.get('batch_mode', False):
+        # Records go to compressed files and only BATCH messages pointing to them are written to stdout
+        writer = BatchWriter.from_config(config, writer)
+
+    # Only the selected streams are synced, and only the Upscale data they need is fetched
+    selected_streams = [stream for stream in catalog.streams if stream.is_selected()]
+    plan = FetchPlan.from_catalog(catalog)
+
+    for stream in selected_streams:
+        LOGGER.debug('Writing %s schema: \n %s \n and key properties: %s',
+            stream.tap_stream_id,
+            stream.schema,
+            stream.key_properties)
+        writer.write_schema(
+            stream.tap_stream_id,
+            stream.schema.to_dict(),
+            stream.key_properties)
+
+    # Opt-in validation of the records against the schemas of their stream, compiled once for the run
+    validator = RecordValidator.from_config(
+        config, {stream.tap_stream_id: stream.schema.to_dict() for stream in selected_streams})
+
+    if config.get('targets'):
+        sync_targets(config, state, plan, writer, validator)
+    else:
+        sync_target(config, state, plan, writer, next(run_timestamps(config)), validator=validator)
+
+    writer.close()
+    if validator is not None:
+        validator.summary()
+
+    return
+
+
+def run_timestamps(config):
+    """ Yield distinct, increasing run timestamps, one per target. The shards of a sync are all given the same
+    `run_timestamp`, so the timestamps and ids of their points match those of a single process """
+    run_timestamp = config.get('run_timestamp')
+    if run_timestamp is not None:
+        started_at = utils.strptime_to_utc(run_timestamp)
+        while True:
+            yield started_at
+            started_at += timedelta(microseconds=1)
+
+    started_at = None
+    while True:
+        now = datetime.now(timezone.utc)
+        while started_at is not None and now <= started_at:
+            now = datetime.now(timezone.utc)
+        started_at = now
+        yield started_at
+
+
+def target_key(config):
+    return '/'.join(str(config.get(key)) for key in ['tenant_id', 'api_selling_tree', 'api_edition_id']
+                    if config.get(key) is not None)
+
+
+def build_target_config(config, target):
+    """ Configuration of a target, whose own keys override the shared ones """
+    target_config = dict(config, **target)
+    del target_config['targets']
+
+    # Every target keeps its own category and attribute cache files
+    for cache_path in ['category_cache_path', 'attribute_cache_path']:
+        if cache_path in config and cache_path not in target:
+            target_config[cache_path] = '{}.{}'.format(
+                config[cache_path], re.sub(r'[^\w.-]', '_', target_key(target_config)))
+
+    return target_config
+
+
+def sync_targets(config, state, plan, writer, validator=None):
+    """ Sync the tenants, selling trees and editions listed in `targets` concurrently.
+    Targets share the connection pool and the cap on requests in flight, and keep their state and handlers apart """
+    states = TargetStates(state, writer.write_serialized_state)
+    transport = SharedTransport(config)
+
+    target_configs = {}
+    for target in config.get('targets'):
+        target_config = build_target_config(config, target)
+        key = target_key(target_config)
+        if key in target_configs:
+            raise Exception('Target {} is listed more than once'.format(key))
+        target_configs[key] = target_config
+
+    max_concurrent_targets = int(config.get('max_concurrent_targets', DEFAULT_MAX_CONCURRENT_TARGETS))
+    LOGGER.info('Syncing %d targets, %d at a time', len(target_configs), max_concurrent_targets)
+
+    errors = []
+    with ThreadPoolExecutor(max_workers=max_concurrent_targets, thread_name_prefix='target') as executor:
+        futures = {}
+        # Point ids start with the run timestamp, so every target gets a distinct one
+        timestamps = run_timestamps(config)
+        for key, target_config in target_configs.items():
+            futures[key] = executor.submit(
+                sync_target, target_config, states.target_state(key), plan, TargetWriter(writer, states, key),
+                next(timestamps), target=key, transport=transport, validator=validator,
+                id_maps={stream: states.id_map(target_config.get('tenant_id'), stream)
+                         for stream in [Record.CATEGORY.value, Record.SPEC.value]})
+
+        for key, future in futures.items():
+            try:
+                future.result()
+            except Exception as error:
+                LOGGER.error('Sync of target %s failed', key, exc_info=error)
+                errors.append(error)
+
+    transport.close()
+
+    if errors:
+        raise errors[0]
+
+
+def sync_target(config, state, plan, writer, run_started_at, target=None, transport=None, validator=None,
+                id_maps=None):
+    """ Sync the products of a single tenant, selling tree and edition. Category and spec ids are kept in the
+    state of the target, unless `id_maps` gives the maps the target shares with the other targets of its tenant """
+    # Values shared by every record of the run
+    context = RecordContext(config.get('tenant_id'), run_started_at.isoformat(), config, target=target)
+
+    metrics = SyncMetrics.from_config(config, tags={'target': target} if target is not None else None)
+    writer = MeteredWriter(writer, metrics)
+    if validator is not None:
+        writer = ValidatingWriter(writer, validator, metrics)
+
+    # Pages are fetched, enriched, transformed and written by separate stages
+    pipeline = SyncPipeline.from_config(config, writer)
+
+    # A shard only syncs its own range of product pages. Ids then must not depend on the pages a process synced,
+    # so category ids follow the category list, new spec ids are built from the attribute key
+    # and point ids continue from the offset of their page
+    shard = Shard.from_config(config)
+    deterministic_ids = shard is not None or config.get('deterministic_ids', False)
+    page_size = int(config.get('page_size', UpscaleClient.PAGE_SIZE))
+
+    # Category and spec ids generated by previous syncs are reused, so they stay stable across runs
+    if id_maps is None:
+        id_maps = {stream: IdMap.from_state(state, stream) for stream in [Record.CATEGORY.value, Record.SPEC.value]}
+    build_record_handler(Record.CATEGORY, target).load_ids(id_maps[Record.CATEGORY.value])
+    build_record_handler(Record.SPEC, target).load_ids(id_maps[Record.SPEC.value], keyed=deterministic_ids)
+
+    bookmark = PageBookmark(state, config, write_state=pipeline.output.write_state)
+    start_page = bookmark.resume_page()
+    if start_page > 1:
+        LOGGER.info('Resuming sync from product page %d', start_page)
+
+    # Opt-in suppression of product and category_product records that did not change since the previous sync
+    fingerprints = RecordFingerprints(
+        state, [stream for stream in [Record.PRODUCT.value, Record.CATEGORY_PRODUCT.value] if stream in plan.streams],
+        enabled=config.get('emit_changed_records_only', False))
+
+    # Opt-in suppression of price and stock points whose value did not move since the last emitted point
+    heartbeat = config.get('point_heartbeat_seconds')
+    points = PointTracker(
+        state, [stream for stream in [Record.PRICE_POINT.value, Record.STOCK_POINT.value] if stream in plan.streams],
+        heartbeat=int(heartbeat) if heartbeat is not None else None,
+        enabled=config.get('emit_point_changes_only', False),
+        now=run_started_at.timestamp())
+
+    def sync_page(page):
+        if deterministic_ids:
+            for record in [Record.PRICE_POINT, Record.STOCK_POINT]:
+                build_record_handler(record, target).seek((page.number - 1) * page_size)
+
+        with metrics.timed('transform'):
+            sync_products(page.products, context, plan, fingerprints, points, pipeline.output)
+
+        bookmark.page_synced(page.number)
+        metrics.page_synced(page.number, len(page.products), page.page_info)
+
+    if plan.products:
+        LOGGER.info('Fetching Upscale products')
+        client = UpscaleClient(config, metrics=metrics, plan=plan, projection=ProductProjection.from_plan(plan),
+                               transport=transport)
+
+        try:
+            end_page = None
+            if shard is not None:
+                pages = shard.page_range(client.count_product_pages())
+                start_page = max(start_page, pages.start)
+                end_page = pages.stop - 1
+                LOGGER.info('Syncing product pages %d to %d as shard %s', pages.start, end_page, shard)
+
+            if deterministic_ids and plan.categories:
+                build_record_handler(Record.CATEGORY, target).assign_ids(
+                    client.category_resolver.load_all(), context.tenant_id)
+
+            # Products are synced page by page as they arrive instead of after the whole catalog is fetched
+            if end_page is None or start_page <= end_page:
+                pipeline.run(client.iter_product_pages(start_page, enrich=False, end_page=end_page),
+                             client.enrich_page, sync_page)
+        finally:
+            client.close()
+            writer.flush()
+            metrics.summary()
+            LOGGER.info('Request stats: %s', client.stats())
+    else:
+        LOGGER.info('No stream synced from products is selected, skipping products')
+
+    # Deleted SKUs are dropped from the state and logged. They can only be told apart from products of skipped
+    # pages when the whole catalog was synced
+    if plan.products and start_page == 1 and shard is None:
+        fingerprints.remove_deleted()
+        points.remove_unseen()
+
+    # Only the final state carries the fingerprints and points, the interim ones would repeat them every time
+    fingerprints.save()
+    points.save()
+    bookmark.sync_completed()
+
+
+def has_categories(product):
+    return any(category_id != "" for category_id in product.get('productCategoryIds', []))
+
+
+def sync_products(products, context, plan, fingerprints, points, writer):
+    """ Write the records of the selected streams for a page of products """
+    categorized_products = []
+    for product in products:
+        # Categories are only resolved when a category stream is selected, so their ids are checked instead
+        if not has_categories(product):
+            LOGGER.debug('Product %s has no category! Skipping ...', product.get('sku'))
+            continue
+        categorized_products.append(product)
+    products = categorized_products
+
+    product_records = build_record_handler(Record.PRODUCT, context.target).generate_batch(products, context) \
+        if plan.selected(Record.PRODUCT) else []
+    for product_record in product_records:
+        if fingerprints.changed(Record.PRODUCT.value, product_record.get('sku'), product_record):
+            LOGGER.debug('Writing product record: %s', product_record)
+            writer.write_record(Record.PRODUCT.value, product_record)
+
+    category_handler = build_record_handler(Record.CATEGORY, context.target)
+    category_product_handler = build_record_handler(Record.CATEGORY_PRODUCT, context.target)
+    for product in products if plan.categories else []:
+        category_ids = []
+        for category in product.get('categories'):
+            category_record = category_handler.generate(category, tenant_id=context.tenant_id)
+            # category record builder returns a record if the category hasn't been handled yet
+            # otherwise, it returns the id of an already handled category record
+            if isinstance(category_record, dict):
+                category_ids.append(category_record.get('id'))
+
+                if plan.selected(Record.CATEGORY):
+                    LOGGER.debug('Writing category record: %s', category_record)
+                    writer.write_record(Record.CATEGORY.value, category_record)
+            else:
+                category_ids.append(category_record)
+
+        if not plan.selected(Record.CATEGORY_PRODUCT):
+            continue
+
+        category_product_records = category_product_handler.generate_batch(
+            [(product.get('sku'), category_id) for category_id in category_ids], context)
+
+        # The category assignments of a product are fingerprinted together
+        if fingerprints.changed(Record.CATEGORY_PRODUCT.value, product.get('sku'), category_product_records):
+            for category_product_record in category_product_records:
+                LOGGER.debug('Writing category_product record: %s', category_product_record)
+                writer.write_record(Record.CATEGORY_PRODUCT.value, category_product_record)
+
+    # Specs are built from the custom attributes of products, qualified by the metadata of the attribute
+    spec_handler = build_record_handler(Record.SPEC, context.target)
+    product_spec_handler = build_record_handler(Record.PRODUCT_SPEC, context.target)
+    for product in products if plan.specs else []:
+        for spec in product.get('specs'):
+            # spec record builder returns a record if the spec hasn't been handled yet
+            # otherwise, it returns the id of an already handled spec record
+            spec_record = spec_handler.generate(spec, tenant_id=context.tenant_id)
+            if isinstance(spec_record, dict):
+                spec_id = spec_record.get('id')
+
+                if plan.selected(Record.SPEC):
+                    LOGGER.debug('Writing spec record: %s', spec_record)
+                    writer.write_record(Record.SPEC.value, spec_record)
+            else:
+                spec_id = spec_record
+
+            if plan.selected(Record.PRODUCT_SPEC):
+                product_spec_record = product_spec_handler.generate(
+                    spec, tenant_id=context.tenant_id, sku=product.get('sku'), spec_id=spec_id)
+                LOGGER.debug('Writing product_spec record: %s', product_spec_record)
+                writer.write_record(Record.PRODUCT_SPEC.value, product_spec_record)
+
+    price_point_records = build_record_handler(Record.PRICE_POINT, context.target).generate_batch(products, context) \
+        if plan.selected(Record.PRICE_POINT) else []
+    for price_point_record in price_point_records:
+        if points.changed(Record.PRICE_POINT.value, price_point_record.get('sku'), price_point_record.get('price')):
+            LOGGER.debug('Writing price_point record: %s', price_point_record)
+            writer.write_record(Record.PRICE_POINT.value, price_point_record)
+
+    stock_point_records = build_record_handler(Record.STOCK_POINT, context.target).generate_batch(products, context) \
+        if plan.selected(Record.STOCK_POINT) else []
+    for stock_point_record in stock_point_records:
+        if points.changed(Record.STOCK_POINT.value, stock_point_record.get('sku'), stock_point_record.get('stock')):
+            LOGGER.debug('Writing stock_point record: %s', stock_point_record)
+            writer.write_record(Record.STOCK_POINT.value, stock_point_record)
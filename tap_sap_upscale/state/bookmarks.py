@@ -0,0 +1,56 @@
+import singer
+
+from tap_sap_upscale.client.upscale_client import UpscaleClient
+from tap_sap_upscale.record.record import Record
+
+LOGGER = singer.get_logger()
+
+
+class PageBookmark:
+    """ Tracks the last fully synced product page in the Singer state, so an interrupted sync resumes
+    from the next page. A bookmark only applies to the selling tree, edition, shard and page size it was written for,
+as pages of another size hold other products """
+
+    STREAM = Record.PRODUCT.value
+
+    def __init__(self, state, config, write_state=singer.write_state):
+        self.state = state
+        self.write_state_message = write_state
+        self.selling_tree = config.get('api_selling_tree')
+        self.edition_id = config.get('api_edition_id')
+        self.shard = config.get('shard')
+        self.page_size = int(config.get('page_size', UpscaleClient.PAGE_SIZE))
+        self.interval = int(config.get('state_interval_pages', 10))
+        self._pages_since_write = 0
+
+    def resume_page(self):
+        bookmark = self.state.get('bookmarks', {}).get(self.STREAM, {})
+        # Bookmarks without a page size were written before it was configurable, with the default one
+        if bookmark.get('selling_tree') != self.selling_tree or bookmark.get('edition_id') != self.edition_id \
+                or bookmark.get('shard') != self.shard \
+                or bookmark.get('page_size', UpscaleClient.PAGE_SIZE) != self.page_size:
+            return 1
+
+        return (bookmark.get('page') or 0) + 1
+
+    def page_synced(self, page):
+        """ Record that every record of `page` has been written. The state is emitted every `interval` pages """
+        singer.write_bookmark(self.state, self.STREAM, 'selling_tree', self.selling_tree)
+        singer.write_bookmark(self.state, self.STREAM, 'edition_id', self.edition_id)
+        if self.shard is not None:
+            singer.write_bookmark(self.state, self.STREAM, 'shard', self.shard)
+        singer.write_bookmark(self.state, self.STREAM, 'page_size', self.page_size)
+        singer.write_bookmark(self.state, self.STREAM, 'page', page)
+
+        self._pages_since_write += 1
+        if self._pages_since_write >= self.interval:
+            self.write_state()
+
+    def sync_completed(self):
+        """ A completed sync starts the next one from the first page again """
+        singer.clear_bookmark(self.state, self.STREAM, 'page')
+        self.write_state()
+
+    def write_state(self):
+        self._pages_since_write = 0
+        self.write_state_message(self.state)
@@ -0,0 +1,67 @@
+import hashlib
+import json
+
+import singer
+
+LOGGER = singer.get_logger()
+
+
+def fingerprint(record):
+    """ Compact digest of a record, or of a list of records, independent of key order """
+    serialized = json.dumps(record, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.blake2b(serialized.encode('utf-8'), digest_size=8).hexdigest()
+
+
+class RecordFingerprints:
+    """ Per-SKU fingerprints of the records emitted for some streams, kept in the state under `fingerprints`.
+    When enabled, records whose fingerprint did not change since the previous sync are not emitted again.
+
+    The fingerprints are taken out of the state while syncing, so the interim STATE messages don't repeat them,
+    and only put back by `save` once the sync completed. A resumed sync then emits its records again """
+
+    def __init__(self, state, streams, enabled=True):
+        self.enabled = enabled
+        self.state = state
+        self.stored = {}
+        self.fingerprints = {}
+        self.seen = {}
+
+        if enabled:
+            self.stored = state.pop('fingerprints', {})
+            for stream in streams:
+                self.fingerprints[stream] = self.stored.setdefault(stream, {})
+                self.seen[stream] = set()
+
+    def changed(self, stream, sku, record):
+        """ Record the fingerprint of the SKU's record(s) and tell whether they have to be emitted """
+        if not self.enabled:
+            return True
+
+        self.seen[stream].add(sku)
+
+        digest = fingerprint(record)
+        if self.fingerprints[stream].get(sku) == digest:
+            return False
+
+        self.fingerprints[stream][sku] = digest
+        return True
+
+    def remove_deleted(self):
+        """ Forget the SKUs which were not seen during a complete sync and return them by stream.
+        They are only dropped from the state and logged, no message tells the target about them """
+        deleted = {}
+        for stream, fingerprints in self.fingerprints.items():
+            deleted[stream] = [sku for sku in fingerprints if sku not in self.seen[stream]]
+            for sku in deleted[stream]:
+                del fingerprints[sku]
+
+            if len(deleted[stream]) > 0:
+                LOGGER.info('%d %s records were deleted since the previous sync', len(deleted[stream]), stream)
+                LOGGER.debug('Deleted %s SKUs: %s', stream, deleted[stream])
+
+        return deleted
+
+    def save(self):
+        """ Put the fingerprints back in the state, for the final STATE message of a completed sync """
+        if self.enabled:
+            self.state['fingerprints'] = self.stored
@@ -0,0 +1,53 @@
+import threading
+
+from tap_sap_upscale.output.writer import dumps
+
+
+class IdMap:
+    """ Maps Upscale keys to the ids generated for them, so the same category or spec keeps its id across syncs.
+    The mapping is kept in the state under `id_maps` and generated ids are the tenant id followed by a code """
+
+    def __init__(self, mapping=None):
+        self.mapping = mapping if mapping is not None else {'nextCode': 1, 'ids': {}}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_state(cls, state, stream):
+        return cls(state.setdefault('id_maps', {}).setdefault(stream, {'nextCode': 1, 'ids': {}}))
+
+    def get(self, key):
+        return self.mapping['ids'].get(key)
+
+    def assign(self, key, prefix):
+        """ Return the id of a key, generating a new one for unknown keys """
+        generated_id = self.mapping['ids'].get(key)
+        if generated_id is not None:
+            return generated_id
+
+        with self._lock:
+            generated_id = self.mapping['ids'].get(key)
+            if generated_id is None:
+                generated_id = prefix + str(self.mapping['nextCode'])
+                self.mapping['nextCode'] += 1
+                self.mapping['ids'][key] = generated_id
+
+            return generated_id
+
+    def assign_id(self, key, generated_id):
+        """ Return the id of a key, keeping `generated_id` for unknown keys """
+        with self._lock:
+            return self.mapping['ids'].setdefault(key, generated_id)
+
+    def assign_all(self, keys, prefix):
+        """ Generate the ids of unknown keys in the given order, without ids generated by other threads in between """
+        with self._lock:
+            ids = self.mapping['ids']
+            for key in keys:
+                if key not in ids:
+                    ids[key] = prefix + str(self.mapping['nextCode'])
+                    self.mapping['nextCode'] += 1
+
+    def serialize(self):
+        """ Serialize the mapping while no id is being generated """
+        with self._lock:
+            return dumps(self.mapping)
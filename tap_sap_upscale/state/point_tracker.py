@@ -0,0 +1,50 @@
+import time
+
+
+class PointTracker:
+    """ Last emitted value of time series streams per SKU, kept in the state under `points` as
+    [value, epoch seconds] pairs. When enabled, a point is only emitted when its value moved or when
+    `heartbeat` seconds passed since the last point, so the history stays complete without repeating itself.
+
+    Like fingerprints, the points are left out of the interim STATE messages and put back by `save` """
+
+    def __init__(self, state, streams, heartbeat=None, enabled=True, now=None):
+        self.enabled = enabled
+        self.heartbeat = heartbeat
+        self.now = int(now if now is not None else time.time())
+        self.state = state
+        self.stored = {}
+        self.points = {}
+        self.seen = {}
+
+        if enabled:
+            self.stored = state.pop('points', {})
+            for stream in streams:
+                self.points[stream] = self.stored.setdefault(stream, {})
+                self.seen[stream] = set()
+
+    def changed(self, stream, sku, value):
+        """ Tell whether a point has to be emitted for the SKU's current value, and remember it if so """
+        if not self.enabled:
+            return True
+
+        self.seen[stream].add(sku)
+
+        last_point = self.points[stream].get(sku)
+        if last_point is not None and last_point[0] == value:
+            if self.heartbeat is None or self.now - last_point[1] < self.heartbeat:
+                return False
+
+        self.points[stream][sku] = [value, self.now]
+        return True
+
+    def remove_unseen(self):
+        """ Forget the SKUs which were not seen during a complete sync """
+        for stream, points in self.points.items():
+            for sku in [sku for sku in points if sku not in self.seen[stream]]:
+                del points[sku]
+
+    def save(self):
+        """ Put the points back in the state, for the final STATE message of a completed sync """
+        if self.enabled:
+            self.state['points'] = self.stored
@@ -0,0 +1,64 @@
+import threading
+
+from tap_sap_upscale.output.writer import dumps
+from tap_sap_upscale.state.id_map import IdMap
+
+
+class TargetStates:
+    """ State of a multi-target sync, which keeps the state of every target under `targets`.
+
+    Each target commits its own state once the records it covers have been written, and STATE messages combine
+    the last state committed by every target, so the progress of a target is never persisted ahead of its records.
+
+    Generated category and spec ids are only made unique by the tenant id, so the targets of a tenant share their
+    id maps, kept under `tenants`. They are written as they are, a map ahead of the records only keeps more ids """
+
+    def __init__(self, state, write_serialized_state):
+        self.targets = state.setdefault('targets', {})
+        self.tenants = state.setdefault('tenants', {})
+        self.write_serialized_state = write_serialized_state
+
+        self._lock = threading.Lock()
+        self._committed = {key: dumps(value) for key, value in self.targets.items()}
+        self._id_maps = {tenant_id: {stream: IdMap(mapping) for stream, mapping in tenant.get('id_maps', {}).items()}
+                         for tenant_id, tenant in self.tenants.items()}
+
+    def target_state(self, key):
+        return self.targets.setdefault(key, {})
+
+    def id_map(self, tenant_id, stream):
+        """ Id map of a stream shared by every target of the tenant """
+        tenant_id = str(tenant_id)
+        with self._lock:
+            id_maps = self._id_maps.setdefault(tenant_id, {})
+            if stream not in id_maps:
+                id_maps[stream] = IdMap.from_state(self.tenants.setdefault(tenant_id, {}), stream)
+
+            return id_maps[stream]
+
+    def commit(self, key, value):
+        # The target is not changing its state while committing it, unlike the other targets
+        serialized = dumps(value)
+        with self._lock:
+            self._committed[key] = serialized
+            self.write_serialized_state(b'{"targets":{' + b','.join(
+                dumps(target) + b':' + target_state for target, target_state in self._committed.items())
+                + b'},"tenants":{' + b','.join(
+                dumps(tenant_id) + b':{"id_maps":{' + b','.join(
+                    dumps(stream) + b':' + id_map.serialize() for stream, id_map in id_maps.items()) + b'}}'
+                for tenant_id, id_maps in self._id_maps.items()) + b'}}')
+
+
+class TargetWriter:
+    """ Writer of a single target, committing its states to the combined state of all targets """
+
+    def __init__(self, writer, states, key):
+        self.writer = writer
+        self.states = states
+        self.key = key
+
+    def write_state(self, value):
+        self.states.commit(self.key, value)
+
+    def __getattr__(self, name):
+        return getattr(self.writer, name)
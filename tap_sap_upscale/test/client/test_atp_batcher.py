@@ -0,0 +1,60 @@
+import threading
+import unittest
+
+from tap_sap_upscale.client.atp_batcher import AtpBatcher
+from tap_sap_upscale.client.fetch_scheduler import FetchScheduler
+
+
+class TestAtpBatcher(unittest.TestCase):
+    def setUp(self):
+        self.scheduler = FetchScheduler(max_workers=4)
+        self.requested_batches = []
+        self.lock = threading.Lock()
+
+    def tearDown(self):
+        self.scheduler.shutdown()
+
+    def fetch_batch(self, product_ids):
+        with self.lock:
+            self.requested_batches.append(product_ids)
+        return {product_id: len(product_id) for product_id in product_ids}
+
+    def test_should_bound_batches_by_id_count(self):
+        batcher = AtpBatcher(self.fetch_batch, self.scheduler, base_url_bytes=10, max_ids=2)
+
+        self.assertEqual([['a', 'b'], ['c', 'd'], ['e']], batcher.batches(['a', 'b', 'c', 'd', 'e']))
+
+    def test_should_bound_batches_by_url_length(self):
+        batcher = AtpBatcher(self.fetch_batch, self.scheduler, base_url_bytes=10, max_ids=50, max_url_bytes=17)
+
+        # 10 bytes of URL plus 'abc,def' fits in 17 bytes, a third id does not
+        self.assertEqual([['abc', 'def'], ['ghi']], batcher.batches(['abc', 'def', 'ghi']))
+
+    def test_should_merge_concurrent_batches(self):
+        batcher = AtpBatcher(self.fetch_batch, self.scheduler, base_url_bytes=10, max_ids=2)
+
+        self.assertEqual({'a': 1, 'bb': 2, 'ccc': 3}, batcher.lookup(['a', 'bb', 'ccc']))
+        self.assertEqual(2, len(self.requested_batches))
+
+    def test_should_coalesce_lookups_within_linger(self):
+        batcher = AtpBatcher(self.fetch_batch, self.scheduler, base_url_bytes=10, max_ids=4, linger=10)
+
+        first = batcher.submit(['a', 'b'])
+        second = batcher.submit(['c', 'd'])
+
+        self.assertEqual({'a': 1, 'b': 1, 'c': 1, 'd': 1}, first.result(timeout=1))
+        self.assertEqual(first.result(), second.result(timeout=1))
+        self.assertEqual([['a', 'b', 'c', 'd']], self.requested_batches)
+
+    def test_should_flush_after_linger(self):
+        batcher = AtpBatcher(self.fetch_batch, self.scheduler, base_url_bytes=10, max_ids=50, linger=0.01)
+
+        self.assertEqual({'a': 1}, batcher.submit(['a']).result(timeout=1))
+
+    def test_should_fail_lookups_of_failed_batches(self):
+        def fail(product_ids):
+            raise Exception('Failed to fetch products inventory with status code: 500')
+
+        batcher = AtpBatcher(fail, self.scheduler, base_url_bytes=10, max_ids=1)
+
+        self.assertRaises(Exception, batcher.lookup, ['a', 'b'])
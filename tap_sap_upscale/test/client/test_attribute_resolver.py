@@ -0,0 +1,97 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from tap_sap_upscale.client.attribute_resolver import AttributeResolver
+from tap_sap_upscale.client.fetch_scheduler import FetchScheduler
+
+all_attributes = {
+    'color': {'attributeKey': 'color', 'label': 'Color'},
+    'size': {'attributeKey': 'size', 'label': 'Size'}
+}
+
+
+class TestAttributeResolver(unittest.TestCase):
+    def setUp(self):
+        self.scheduler = FetchScheduler(max_workers=4)
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'attributes.json')
+        self.fetched_keys = []
+        self.released = threading.Event()
+        self.released.set()
+
+    def tearDown(self):
+        self.scheduler.shutdown()
+        shutil.rmtree(self.directory)
+
+    def fetch_attribute(self, attribute_key):
+        self.released.wait()
+        self.fetched_keys.append(attribute_key)
+        return all_attributes.get(attribute_key)
+
+    def build_resolver(self, edition_id='e1', ttl=3600):
+        return AttributeResolver(self.fetch_attribute, self.scheduler, edition_id=edition_id, path=self.path, ttl=ttl)
+
+    def test_should_fetch_each_attribute_once(self):
+        resolver = self.build_resolver()
+
+        self.assertEqual(all_attributes, resolver.resolve(['color', 'size', 'color']))
+        self.assertEqual({'color': all_attributes['color']}, resolver.resolve(['color']))
+        self.assertEqual(['color', 'size'], sorted(self.fetched_keys))
+
+    def test_should_share_requests_in_flight(self):
+        resolver = self.build_resolver()
+        self.released.clear()
+
+        first = resolver.prefetch(['color'])
+        second = resolver.prefetch(['color'])
+        self.released.set()
+
+        self.assertIs(first['color'], second['color'])
+        self.assertEqual({'color': all_attributes['color']}, resolver.resolve(['color']))
+        self.assertEqual(['color'], self.fetched_keys)
+
+    def test_should_remember_unknown_attributes(self):
+        resolver = self.build_resolver()
+
+        self.assertEqual({}, resolver.resolve(['unknown']))
+        self.assertEqual({}, resolver.resolve(['unknown']))
+        self.assertEqual(['unknown'], self.fetched_keys)
+
+    def test_should_reuse_persisted_attributes(self):
+        resolver = self.build_resolver()
+        resolver.resolve(['color'])
+        resolver.save()
+
+        resolver = self.build_resolver()
+        self.assertEqual({'color': all_attributes['color']}, resolver.resolve(['color']))
+        self.assertEqual(['color'], self.fetched_keys)
+
+    def test_should_fetch_expired_attributes_again(self):
+        resolver = self.build_resolver(ttl=0)
+        resolver.resolve(['color'])
+        resolver.save()
+
+        self.build_resolver(ttl=0).resolve(['color'])
+
+        self.assertEqual(['color', 'color'], self.fetched_keys)
+
+    def test_should_not_reuse_attributes_of_other_edition(self):
+        resolver = self.build_resolver(edition_id='e1')
+        resolver.resolve(['color'])
+        resolver.save()
+
+        self.build_resolver(edition_id='e2').resolve(['color'])
+
+        self.assertEqual(['color', 'color'], self.fetched_keys)
+
+    def test_should_ignore_cache_of_other_version(self):
+        with open(self.path, 'w') as file:
+            json.dump({'version': 0, 'attributes': {'e1:color': {'attribute': {}, 'fetchedAt': 0}}}, file)
+
+        self.build_resolver().resolve(['color'])
+
+        self.assertEqual(['color'], self.fetched_keys)
@@ -0,0 +1,121 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from unittest import mock
+
+from tap_sap_upscale.client.category_resolver import CategoryResolver
+from tap_sap_upscale.client.fetch_scheduler import FetchScheduler
+
+all_categories = {
+    'category_id': {'id': 'category_id', 'name': 'Category name'},
+    'category_id_2': {'id': 'category_id_2', 'name': 'Category name 2'},
+    'category_id_3': {'id': 'category_id_3', 'name': 'Category name 3'}
+}
+
+
+class TestCategoryResolver(unittest.TestCase):
+    def setUp(self):
+        self.scheduler = FetchScheduler(max_workers=2)
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'categories.json')
+        self.listings = 0
+        self.fetched_ids = []
+
+    def tearDown(self):
+        self.scheduler.shutdown()
+        shutil.rmtree(self.directory)
+
+    def fetch_categories(self):
+        self.listings += 1
+        return dict(all_categories)
+
+    def fetch_category(self, category_id):
+        self.fetched_ids.append(category_id)
+        return all_categories.get(category_id)
+
+    def build_resolver(self, edition_id='e1', ttl=3600, page_size=50):
+        return CategoryResolver(self.fetch_categories, self.fetch_category, self.scheduler,
+                                edition_id=edition_id, path=self.path, ttl=ttl, page_size=page_size)
+
+    def test_should_fill_cold_cache_from_category_list(self):
+        resolver = self.build_resolver()
+        self.assertTrue(resolver.needs_refresh())
+
+        resolver.load_all()
+
+        self.assertFalse(resolver.needs_refresh())
+        self.assertEqual({'category_id': all_categories['category_id']}, resolver.resolve(['category_id']))
+        self.assertEqual(1, self.listings)
+        self.assertEqual([], self.fetched_ids)
+
+    def test_should_reuse_persisted_categories(self):
+        resolver = self.build_resolver()
+        resolver.load_all()
+        resolver.save()
+
+        resolver = self.build_resolver()
+        self.assertFalse(resolver.needs_refresh())
+        self.assertEqual(2, len(resolver.resolve(['category_id', 'category_id_2'])))
+        self.assertEqual(1, self.listings)
+        self.assertEqual([], self.fetched_ids)
+
+    def test_should_only_fetch_missing_categories(self):
+        resolver = self.build_resolver()
+        resolver.store([all_categories['category_id']])
+
+        self.assertEqual(2, len(resolver.resolve(['category_id', 'category_id_2'])))
+        self.assertEqual(['category_id_2'], self.fetched_ids)
+        self.assertEqual(0, self.listings)
+
+    def test_should_refetch_stale_categories(self):
+        resolver = self.build_resolver(ttl=0)
+        resolver.store([all_categories['category_id']])
+
+        resolver.resolve(['category_id'])
+        self.assertEqual(['category_id'], self.fetched_ids)
+
+    def test_should_page_through_categories_when_cheaper(self):
+        resolver = self.build_resolver(page_size=1)
+        resolver.store([all_categories['category_id']])
+
+        self.assertEqual(2, len(resolver.resolve(['category_id_2', 'category_id_3'])))
+        self.assertEqual(1, self.listings)
+        self.assertEqual([], self.fetched_ids)
+
+    def test_should_refresh_cache_once_largely_outdated(self):
+        resolver = self.build_resolver(page_size=2)
+        self.assertTrue(resolver.needs_refresh())
+
+        resolver.load_all()
+        self.assertFalse(resolver.needs_refresh())
+
+        # Categories of the list expire together, and three outdated ones take more requests than two pages
+        resolver.ttl = 0
+        self.assertTrue(resolver.needs_refresh())
+
+    def test_should_not_refresh_cache_for_few_outdated_categories(self):
+        resolver = self.build_resolver()
+        resolver.load_all()
+        with mock.patch('tap_sap_upscale.client.category_resolver.time.time', return_value=0):
+            resolver.store([all_categories['category_id']])
+
+        self.assertFalse(resolver.needs_refresh())
+
+    def test_should_leave_out_unknown_categories(self):
+        resolver = self.build_resolver()
+        resolver.store([all_categories['category_id']])
+
+        self.assertEqual(['category_id'], list(resolver.resolve(['category_id', 'unknown'])))
+
+    def test_should_key_categories_by_edition(self):
+        resolver = self.build_resolver(edition_id='e1')
+        resolver.load_all()
+        resolver.save()
+
+        self.assertTrue(self.build_resolver(edition_id='e2').needs_refresh())
+
+        with open(self.path) as file:
+            self.assertIn('e1:category_id', json.load(file)['categories'])
@@ -0,0 +1,43 @@
+import unittest
+
+from tap_sap_upscale import discover
+from tap_sap_upscale.client.fetch_plan import FetchPlan
+from tap_sap_upscale.record.record import Record
+
+
+class TestFetchPlan(unittest.TestCase):
+    def test_should_only_fetch_products_for_price_points(self):
+        plan = FetchPlan(['price_point'])
+
+        self.assertTrue(plan.products)
+        self.assertFalse(plan.inventory)
+        self.assertFalse(plan.categories)
+        self.assertTrue(plan.selected(Record.PRICE_POINT))
+        self.assertFalse(plan.selected(Record.PRODUCT))
+
+    def test_should_fetch_categories_for_category_products(self):
+        plan = FetchPlan(['category_product'])
+
+        self.assertTrue(plan.categories)
+        self.assertFalse(plan.inventory)
+
+    def test_should_fetch_custom_attributes_for_specs(self):
+        plan = FetchPlan(['product_spec'])
+
+        self.assertTrue(plan.products)
+        self.assertTrue(plan.specs)
+        self.assertFalse(plan.categories)
+
+    def test_should_skip_products_without_product_streams(self):
+        self.assertFalse(FetchPlan(['customer_specific_price']).products)
+        self.assertTrue(FetchPlan.everything().inventory)
+
+    def test_should_plan_selected_streams_of_catalog(self):
+        catalog = discover()
+        for stream in catalog.streams:
+            stream.metadata = [{'metadata': {'selected': stream.tap_stream_id == 'stock_point'}, 'breadcrumb': []}]
+
+        plan = FetchPlan.from_catalog(catalog)
+
+        self.assertEqual(frozenset(['stock_point']), plan.streams)
+        self.assertTrue(plan.inventory)
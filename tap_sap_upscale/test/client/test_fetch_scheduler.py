@@ -0,0 +1,70 @@
+import threading
+import time
+import unittest
+
+from tap_sap_upscale.client.fetch_scheduler import FetchScheduler
+
+
+class TestFetchScheduler(unittest.TestCase):
+    def setUp(self):
+        self.scheduler = FetchScheduler(max_workers=4)
+
+    def tearDown(self):
+        self.scheduler.shutdown()
+
+    def test_should_yield_results_in_order(self):
+        # Later items finish first, results must still come out in item order
+        def fetch(page):
+            time.sleep((5 - page) * 0.01)
+            return page
+
+        self.assertEqual([1, 2, 3, 4], list(self.scheduler.ordered(fetch, [1, 2, 3, 4], 4)))
+
+    def test_should_bound_calls_in_flight(self):
+        lock = threading.Lock()
+        in_flight = [0]
+        max_in_flight = [0]
+
+        def fetch(page):
+            with lock:
+                in_flight[0] += 1
+                max_in_flight[0] = max(max_in_flight[0], in_flight[0])
+            time.sleep(0.01)
+            with lock:
+                in_flight[0] -= 1
+            return page
+
+        self.assertEqual(list(range(10)), list(self.scheduler.ordered(fetch, range(10), 2)))
+        self.assertEqual(2, max_in_flight[0])
+
+    def test_should_raise_fetch_errors(self):
+        def fetch(page):
+            if page == 2:
+                raise Exception('Failed to fetch page')
+            return page
+
+        results = self.scheduler.ordered(fetch, [1, 2, 3], 2)
+        self.assertEqual(1, next(results))
+        self.assertRaises(Exception, next, results)
+
+    def test_should_chain_dependent_calls(self):
+        page = self.scheduler.submit(lambda: ['a1b2c3', 'd4e5f6'])
+        inventory = self.scheduler.then(page, lambda product_ids: {product_id: 1 for product_id in product_ids})
+
+        self.assertEqual({'a1b2c3': 1, 'd4e5f6': 1}, inventory.result(timeout=1))
+
+    def test_should_propagate_errors_to_dependent_calls(self):
+        def fail():
+            raise ValueError('Failed to fetch page')
+
+        calls = []
+        inventory = self.scheduler.then(self.scheduler.submit(fail), calls.append)
+
+        self.assertRaises(ValueError, inventory.result, 1)
+        self.assertEqual([], calls)
+
+    def test_should_flatten_chained_futures(self):
+        page = self.scheduler.submit(lambda: 'a1b2c3')
+        inventory = self.scheduler.then(page, lambda product_id: self.scheduler.submit(lambda: {product_id: 5}))
+
+        self.assertEqual({'a1b2c3': 5}, inventory.result(timeout=1))
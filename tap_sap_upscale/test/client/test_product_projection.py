@@ -0,0 +1,66 @@
+import json
+import unittest
+
+from tap_sap_upscale.client import product_projection
+from tap_sap_upscale.client.fetch_plan import FetchPlan
+from tap_sap_upscale.client.product_projection import ProductProjection, parse_product_page
+from tap_sap_upscale.test.client.test_upscale_client import product_search_response
+
+product = {
+    'id': 'a1b2c3',
+    'sku': 'a1b2c3',
+    'name': 'Product 1 name',
+    'price': {
+        'originalPrice': 1.1,
+        'sellingPrice': 1.1,
+        'surcharge': {'amount': 0.5}
+    },
+    'media': [
+        {'thumbnail': 'https://api.test.com/thumbnail-image', 'fullSize': 'https://api.test.com/fullsize-image'}
+    ],
+    'customAttributes': {'attribute_key': 'value'},
+    'productCategoryIds': ['category_id']
+}
+
+
+class TestProductProjection(unittest.TestCase):
+    def test_should_keep_fields_of_price_points(self):
+        projection = ProductProjection.from_plan(FetchPlan(['price_point']))
+
+        self.assertEqual({
+            'id': 'a1b2c3',
+            'sku': 'a1b2c3',
+            'price': {'sellingPrice': 1.1},
+            'productCategoryIds': ['category_id']
+        }, projection.project(product))
+
+    def test_should_project_list_items(self):
+        projection = ProductProjection(['media.fullSize', 'price'])
+
+        self.assertEqual({
+            'price': product['price'],
+            'media': [{'fullSize': 'https://api.test.com/fullsize-image'}]
+        }, projection.project(product))
+
+    def test_should_keep_whole_values_over_their_fields(self):
+        projection = ProductProjection(['price', 'price.sellingPrice'])
+
+        self.assertEqual({'price': product['price']}, projection.project(product))
+
+    @unittest.skipIf(product_projection.ijson is None, 'ijson is not installed')
+    def test_should_parse_pages_incrementally(self):
+        content = json.dumps(product_search_response).encode('utf-8')
+        projection = ProductProjection.from_plan(FetchPlan.everything())
+
+        self.assertEqual(parse_product_page(content, projection),
+                         parse_product_page(content, projection, incremental=True))
+        self.assertEqual(product_search_response['page'], parse_product_page(content, incremental=True)[1])
+
+    @unittest.skipIf(product_projection.ijson is None, 'ijson is not installed')
+    def test_should_parse_paging_before_products_incrementally(self):
+        content = json.dumps({'page': product_search_response['page'],
+                              'links': {'content': [{'page': 1}]},
+                              'content': product_search_response['content']}).encode('utf-8')
+
+        self.assertEqual((product_search_response['content'], product_search_response['page']),
+                         parse_product_page(content, incremental=True))
@@ -0,0 +1,58 @@
+import time
+import unittest
+
+from tap_sap_upscale.client.rate_limiter import AdaptiveRateLimiter
+
+
+class TestAdaptiveRateLimiter(unittest.TestCase):
+    def test_should_not_wait_without_rate(self):
+        limiter = AdaptiveRateLimiter()
+
+        self.assertEqual(0, sum(limiter.acquire() for _ in range(100)))
+
+    def test_should_limit_request_rate(self):
+        limiter = AdaptiveRateLimiter(rate=100)
+
+        started_at = time.monotonic()
+        for _ in range(11):
+            limiter.acquire()
+
+        self.assertGreaterEqual(time.monotonic() - started_at, 0.09)
+        self.assertGreater(limiter.throttle_time, 0)
+
+    def test_should_slow_down_when_throttled(self):
+        limiter = AdaptiveRateLimiter(rate=10, min_rate=4)
+
+        limiter.throttled()
+        self.assertEqual(5, limiter.rate)
+
+        limiter.throttled()
+        self.assertEqual(4, limiter.rate)
+        self.assertEqual(2, limiter.throttled_responses)
+
+    def test_should_speed_back_up_to_max_rate(self):
+        limiter = AdaptiveRateLimiter(rate=10, increase_step=1)
+
+        limiter.throttled()
+        for _ in range(3):
+            limiter.succeeded()
+        self.assertEqual(8, limiter.rate)
+
+        for _ in range(10):
+            limiter.succeeded()
+        self.assertEqual(10, limiter.rate)
+
+    def test_should_start_from_observed_rate_when_throttled(self):
+        limiter = AdaptiveRateLimiter(min_rate=1)
+        for _ in range(10):
+            limiter.acquire()
+
+        limiter.throttled()
+        self.assertIsNotNone(limiter.rate)
+        self.assertGreaterEqual(limiter.rate, 1)
+
+    def test_should_pause_requests_after_retry_after(self):
+        limiter = AdaptiveRateLimiter()
+
+        limiter.throttled(retry_after=0.05)
+        self.assertGreater(limiter.acquire(), 0)
@@ -0,0 +1,74 @@
+import shutil
+import tempfile
+import unittest
+
+from tap_sap_upscale.client.response_cache import ResponseCache, normalize_url
+
+
+class FakeResponse:
+    def __init__(self, content, headers):
+        self.content = content
+        self.headers = headers
+
+
+class TestResponseCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_should_normalize_urls(self):
+        self.assertEqual(
+            normalize_url('HTTPS://API.test.com/categories?pageSize=50&editionId=e1&pageNumber=1'),
+            normalize_url('https://api.test.com/categories?editionId=e1&pageNumber=1&pageSize=50'))
+
+        self.assertNotEqual(
+            normalize_url('https://api.test.com/categories?pageNumber=1&editionId=e1'),
+            normalize_url('https://api.test.com/categories?pageNumber=1&editionId=e2'))
+
+    def test_should_store_and_revalidate_responses(self):
+        cache = ResponseCache(self.directory)
+        cache.store('category_search', 'https://api.test.com/categories?pageNumber=1',
+                    FakeResponse(b'{"content": []}', {'ETag': '"v1"'}))
+
+        entry = cache.lookup('https://api.test.com/categories?pageNumber=1')
+        self.assertEqual({'If-None-Match': '"v1"'}, entry.conditional_headers())
+        self.assertFalse(cache.is_fresh(entry, 'category_search'))
+        self.assertEqual({'content': []}, cache.load(entry).json())
+
+    def test_should_serve_fresh_entries_within_ttl(self):
+        cache = ResponseCache(self.directory, ttls={'category_search': 3600})
+        cache.store('category_search', 'https://api.test.com/categories?pageNumber=1',
+                    FakeResponse(b'{}', {}))
+
+        entry = cache.lookup('https://api.test.com/categories?pageNumber=1')
+        self.assertTrue(cache.is_fresh(entry, 'category_search'))
+        self.assertFalse(cache.is_fresh(entry, 'product_search'))
+
+    def test_should_not_store_responses_that_cannot_be_revalidated(self):
+        cache = ResponseCache(self.directory)
+        cache.store('product_search', 'https://api.test.com/products?pageNumber=1', FakeResponse(b'{}', {}))
+
+        self.assertIsNone(cache.lookup('https://api.test.com/products?pageNumber=1'))
+
+    def test_should_evict_least_recently_used_entries(self):
+        cache = ResponseCache(self.directory, max_bytes=10)
+        cache.store('product_search', 'https://api.test.com/p?pageNumber=1', FakeResponse(b'12345', {'ETag': '1'}))
+        cache.store('product_search', 'https://api.test.com/p?pageNumber=2', FakeResponse(b'12345', {'ETag': '2'}))
+
+        cache.lookup('https://api.test.com/p?pageNumber=1')
+        cache.store('product_search', 'https://api.test.com/p?pageNumber=3', FakeResponse(b'12345', {'ETag': '3'}))
+
+        self.assertIsNotNone(cache.lookup('https://api.test.com/p?pageNumber=1'))
+        self.assertIsNone(cache.lookup('https://api.test.com/p?pageNumber=2'))
+        self.assertIsNotNone(cache.lookup('https://api.test.com/p?pageNumber=3'))
+        self.assertEqual(10, cache.total_bytes)
+
+    def test_should_persist_entries_across_runs(self):
+        cache = ResponseCache(self.directory)
+        cache.store('product_search', 'https://api.test.com/p?pageNumber=1', FakeResponse(b'{}', {'ETag': '1'}))
+        cache.save()
+
+        entry = ResponseCache(self.directory).lookup('https://api.test.com/p?pageNumber=1')
+        self.assertEqual('1', entry.etag)
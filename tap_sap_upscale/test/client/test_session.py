@@ -0,0 +1,37 @@
+import unittest
+
+from tap_sap_upscale.client.session import build_session, build_timeouts
+
+
+class TestSession(unittest.TestCase):
+    def test_should_negotiate_compression_and_keep_alive(self):
+        session = build_session({}, pool_size=4)
+
+        self.assertIn('gzip', session.headers['Accept-Encoding'])
+        self.assertEqual('en-US', session.headers['Accept-Language'])
+        self.assertNotEqual('close', session.headers.get('Connection'))
+        self.assertEqual(4, session.get_adapter('https://api.test.com')._pool_maxsize)
+
+    def test_should_close_connections_without_keep_alive(self):
+        session = build_session({'http_keep_alive': False, 'http_pool_size': 8}, pool_size=4)
+
+        self.assertEqual('close', session.headers['Connection'])
+        self.assertEqual(8, session.get_adapter('https://api.test.com')._pool_maxsize)
+
+    def test_should_build_per_endpoint_timeouts(self):
+        timeouts = build_timeouts({
+            'request_timeout': 5,
+            'request_timeouts': {
+                'inventory_search': 30,
+                'category_search': [3, 60]
+            }
+        }, ['product_search', 'inventory_search', 'category_search'])
+
+        self.assertEqual({
+            'product_search': 5,
+            'inventory_search': 30,
+            'category_search': (3, 60)
+        }, timeouts)
+
+    def test_should_default_timeouts_to_ten_seconds(self):
+        self.assertEqual({'product_search': 10}, build_timeouts({}, ['product_search']))
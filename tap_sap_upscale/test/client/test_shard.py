@@ -0,0 +1,25 @@
+import unittest
+
+from tap_sap_upscale.client.shard import Shard
+
+
+class TestShard(unittest.TestCase):
+    def test_should_parse_shard(self):
+        shard = Shard.parse('2/4')
+
+        self.assertEqual((2, 4), (shard.index, shard.count))
+        self.assertEqual('2/4', str(shard))
+
+    def test_should_reject_invalid_shard(self):
+        for value in ['0/4', '5/4', '1/0', '2', 'a/b']:
+            self.assertRaises(Exception, Shard.parse, value)
+
+    def test_should_cover_every_page_once(self):
+        for total_pages in [0, 1, 3, 10, 11]:
+            pages = [page for index in range(1, 5) for page in Shard(index, 4).page_range(total_pages)]
+
+            self.assertEqual(list(range(1, total_pages + 1)), pages)
+
+    def test_should_split_pages_evenly(self):
+        self.assertEqual([range(1, 3), range(3, 6), range(6, 8), range(8, 11)],
+                         [Shard(index, 4).page_range(10) for index in range(1, 5)])
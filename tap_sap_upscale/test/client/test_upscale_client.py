@@ -1,5 +1,7 @@
 import httpretty
 import json
+import shutil
+import tempfile
 import unittest
 import warnings
 
@@ -75,6 +77,11 @@ product_search_response = {
     },
 }
 
+custom_attribute_response = {
+    'attributeKey': 'attribute_key',
+    'label': 'Attribute label'
+}
+
 inventory_result = {
     "atpChecks": [
         {
@@ -113,6 +120,13 @@ expected_product_list = [
                 'id': 'category_id',
                 'name': 'Category name'
             }
+        ],
+        'specs': [
+            {
+                'attributeKey': 'attribute_key',
+                'label': 'Attribute label',
+                'value': 'value'
+            }
         ]
     },
     {
@@ -135,6 +149,13 @@ expected_product_list = [
                 'id': 'category_id_2',
                 'name': 'Category name 2'
             }
+        ],
+        'specs': [
+            {
+                'attributeKey': 'attribute_key',
+                'label': 'Attribute label',
+                'value': 'value'
+            }
         ]
     }
 ]
@@ -192,6 +213,11 @@ class TestUpscaleClient(unittest.TestCase):
             self.client.category_search_url.format(initial_page, page_size),
             body=json.dumps(category_search_response))
 
+        httpretty.register_uri(
+            httpretty.GET,
+            self.client.custom_attribute_url.format('attribute_key'),
+            body=json.dumps(custom_attribute_response))
+
         httpretty.register_uri(
             httpretty.GET,
             self.client.inventory_search_url.format('a1b2c3,d4e5f6'),
@@ -200,3 +226,132 @@ class TestUpscaleClient(unittest.TestCase):
         products = self.client.fetch_products()
         
         self.assertEqual(expected_product_list, products)
+
+    @httpretty.activate
+    def test_should_yield_product_pages_in_order(self):
+        self.client = UpscaleClient({
+            'api_scheme': 'https',
+            'api_base_url': 'api.test.com',
+            'api_selling_tree': 'a1b2-c3d4-e5f6',
+            'max_concurrent_pages': 2
+        })
+
+        first_page = dict(product_search_response, content=product_search_response['content'][:1],
+                          page=dict(product_search_response['page'], totalPages=2))
+        second_page = dict(product_search_response, content=product_search_response['content'][1:],
+                           page=dict(product_search_response['page'], totalPages=2, number=2))
+
+        httpretty.register_uri(
+            httpretty.GET,
+            self.client.product_search_url.format('a1b2-c3d4-e5f6', 1, 50),
+            body=json.dumps(first_page), match_querystring=True)
+
+        httpretty.register_uri(
+            httpretty.GET,
+            self.client.product_search_url.format('a1b2-c3d4-e5f6', 2, 50),
+            body=json.dumps(second_page), match_querystring=True)
+
+        httpretty.register_uri(
+            httpretty.GET,
+            self.client.category_search_url.format(1, 50),
+            body=json.dumps(category_search_response))
+
+        httpretty.register_uri(
+            httpretty.GET,
+            self.client.custom_attribute_url.format('attribute_key'),
+            body=json.dumps(custom_attribute_response))
+
+        httpretty.register_uri(
+            httpretty.GET,
+            self.client.inventory_search_url.format(''),
+            body=json.dumps(inventory_result))
+
+        pages = self.client.iter_product_pages()
+
+        page = next(pages)
+        self.assertEqual(1, page.number)
+        self.assertEqual([expected_product_list[0]], page.products)
+
+        page = next(pages)
+        self.assertEqual(2, page.number)
+        self.assertEqual([expected_product_list[1]], page.products)
+
+        self.assertRaises(StopIteration, next, pages)
+
+    @httpretty.activate
+    def test_should_retry_transient_failures(self):
+        self.client = UpscaleClient({
+            'api_scheme': 'https',
+            'api_base_url': 'api.test.com',
+            'api_selling_tree': 'a1b2-c3d4-e5f6',
+            'retry_backoff_base': 0
+        })
+
+        httpretty.register_uri(
+            httpretty.GET,
+            self.client.category_search_url.format(1, 50),
+            responses=[
+                httpretty.Response(body='', status=502),
+                httpretty.Response(body='', status=429, adding_headers={'Retry-After': '0'}),
+                httpretty.Response(body=json.dumps(category_search_response), status=200)
+            ])
+
+        self.assertEqual(3, len(self.client.fetch_categories()))
+
+        stats = self.client.stats()
+        self.assertEqual(2, stats['retries'])
+        self.assertEqual(3, stats['category_search'])
+        self.assertEqual(1, stats['throttled_responses'])
+
+        latency = self.client.metrics.requests['category_search']
+        self.assertEqual(3, latency.count)
+        self.assertEqual(len(json.dumps(category_search_response)), latency.bytes)
+
+    @httpretty.activate
+    def test_should_fail_once_retries_are_exhausted(self):
+        self.client = UpscaleClient({
+            'api_scheme': 'https',
+            'api_base_url': 'api.test.com',
+            'api_selling_tree': 'a1b2-c3d4-e5f6',
+            'retry_backoff_base': 0,
+            'max_retries': 1
+        })
+
+        httpretty.register_uri(
+            httpretty.GET,
+            self.client.category_search_url.format(1, 50),
+            body='',
+            status=503)
+
+        self.assertRaises(Exception, self.client.fetch_categories)
+        self.assertEqual(1, self.client.stats()['retries'])
+
+    @httpretty.activate
+    def test_should_reuse_cached_body_when_not_modified(self):
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir)
+
+        config = {
+            'api_scheme': 'https',
+            'api_base_url': 'api.test.com',
+            'api_selling_tree': 'a1b2-c3d4-e5f6',
+            'response_cache_dir': cache_dir
+        }
+        self.client = UpscaleClient(config)
+
+        httpretty.register_uri(
+            httpretty.GET,
+            self.client.category_search_url.format(1, 50),
+            responses=[
+                httpretty.Response(body=json.dumps(category_search_response), status=200,
+                                   adding_headers={'ETag': '"v1"'}),
+                httpretty.Response(body='', status=304)
+            ])
+
+        self.assertEqual(3, len(self.client.fetch_categories()))
+        self.client.close()
+
+        self.client = UpscaleClient(config)
+        self.assertEqual(3, len(self.client.fetch_categories()))
+        self.assertEqual('"v1"', httpretty.last_request().headers.get('If-None-Match'))
+        self.assertEqual(1, self.client.stats()['cache_revalidations'])
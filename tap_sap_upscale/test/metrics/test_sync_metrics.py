@@ -0,0 +1,109 @@
+import json
+import threading
+import unittest
+
+from unittest import mock
+
+from tap_sap_upscale.metrics.sync_metrics import LatencyHistogram, MeteredWriter, SyncMetrics
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def logged_metrics(logger):
+    return [json.loads(call.args[1]) for call in logger.info.call_args_list if call.args[0] == 'METRIC: %s']
+
+
+class TestLatencyHistogram(unittest.TestCase):
+    def test_should_report_bucket_bounds_as_percentiles(self):
+        histogram = LatencyHistogram()
+        for seconds in [0.02] * 9 + [3.0]:
+            histogram.observe(seconds, 100)
+
+        self.assertEqual(10, histogram.count)
+        self.assertEqual(1000, histogram.bytes)
+        self.assertEqual(0.025, histogram.percentile(0.5))
+        self.assertEqual(3.0, histogram.percentile(0.95))
+
+
+class TestSyncMetrics(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.logger = mock.Mock()
+        self.metrics = SyncMetrics(interval=60, clock=self.clock, logger=self.logger)
+
+    def test_should_time_phases_and_records(self):
+        def slow_write(stream, record):
+            self.clock.now += 0.5
+
+        writer = MeteredWriter(mock.Mock(write_record=slow_write), self.metrics)
+
+        with self.metrics.timed('transform'):
+            self.clock.now += 2
+        writer.write_record('product', {'sku': 'a1b2c3'})
+
+        self.assertEqual(2, self.metrics.phases['transform'])
+        self.assertEqual(0.5, self.metrics.phases['emit'])
+        self.assertEqual(1, self.metrics.records['product'])
+
+    def test_should_time_batches_of_records(self):
+        def slow_write(stream, record):
+            self.clock.now += 0.25
+
+        writer = MeteredWriter(mock.Mock(write_record=slow_write), self.metrics)
+        writer.write_records([('product', {'sku': 'a1b2c3'}), ('price_point', {'sku': 'a1b2c3'})])
+
+        self.assertEqual(0.5, self.metrics.phases['emit'])
+        self.assertEqual({'product': 1, 'price_point': 1}, dict(self.metrics.records))
+
+    def test_should_estimate_remaining_time_from_total_elements(self):
+        self.clock.now = 10
+        self.metrics.page_synced(1, 50, {'size': 50, 'totalElements': 200})
+
+        self.assertEqual(30, self.metrics.eta())
+
+    def test_should_report_record_counts_since_last_report(self):
+        writer = MeteredWriter(mock.Mock(), self.metrics)
+        writer.write_record('product', {'sku': 'a1b2c3'})
+        writer.write_record('product', {'sku': 'd4e5f6'})
+
+        self.clock.now = 60
+        self.metrics.page_synced(1, 2, {'size': 50, 'totalElements': 2})
+        writer.write_record('product', {'sku': 'g7h8i9'})
+        self.metrics.report()
+
+        record_counts = [metric['value'] for metric in logged_metrics(self.logger)
+                         if metric['metric'] == 'record_count']
+        self.assertEqual([2, 1], record_counts)
+
+    def test_should_count_records_written_while_reporting(self):
+        writer = MeteredWriter(mock.Mock(), self.metrics)
+
+        def emit():
+            for index in range(2000):
+                writer.write_records([('stream_{}'.format(index % 50), {}), ('product', {})])
+
+        thread = threading.Thread(target=emit)
+        thread.start()
+        while thread.is_alive():
+            self.metrics.report()
+        thread.join()
+
+        self.assertEqual(2000, self.metrics.records['product'])
+        self.assertEqual(4000, sum(self.metrics.records.values()))
+
+    def test_should_summarize_requests_per_endpoint(self):
+        self.metrics.observe_request('product_search', 0.2, 1024)
+        self.metrics.observe_request('product_search', 0.4, 2048)
+        self.metrics.summary()
+
+        request_metrics = [metric for metric in logged_metrics(self.logger)
+                           if metric['metric'] == 'http_request_duration']
+        self.assertEqual(1, len(request_metrics))
+        self.assertEqual({'endpoint': 'product_search', 'requests': 2, 'bytes': 3072, 'p50': 0.25, 'p95': 0.4,
+                          'max': 0.4}, request_metrics[0]['tags'])
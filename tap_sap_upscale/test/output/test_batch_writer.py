@@ -0,0 +1,86 @@
+import gzip
+import io
+import json
+import shutil
+import tempfile
+import unittest
+
+from tap_sap_upscale.output.batch_writer import BatchWriter
+from tap_sap_upscale.output.writer import RecordWriter
+
+
+class TestBatchWriter(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.output = io.StringIO()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def build_writer(self, rows_per_file, rows_per_state=100):
+        return BatchWriter(RecordWriter(self.output), self.directory, rows_per_file=rows_per_file,
+                           rows_per_state=rows_per_state)
+
+    def written_messages(self):
+        return [json.loads(line) for line in self.output.getvalue().splitlines()]
+
+    def read_batch(self, message):
+        with gzip.open(message['manifest'][0][len('file://'):]) as file:
+            return [json.loads(line) for line in file]
+
+    def test_should_rotate_files_after_rows_per_file(self):
+        writer = self.build_writer(rows_per_file=2)
+        for sku in ['a1b2c3', 'd4e5f6', 'g7h8i9']:
+            writer.write_record('product', {'sku': sku})
+        writer.close()
+
+        messages = self.written_messages()
+        self.assertEqual(['BATCH', 'BATCH'], [message['type'] for message in messages])
+        self.assertEqual({'format': 'jsonl', 'compression': 'gzip'}, messages[0]['encoding'])
+        self.assertEqual([{'sku': 'a1b2c3'}, {'sku': 'd4e5f6'}], self.read_batch(messages[0]))
+        self.assertEqual([{'sku': 'g7h8i9'}], self.read_batch(messages[1]))
+
+    def test_should_announce_files_before_state(self):
+        writer = self.build_writer(rows_per_file=100)
+        writer.write_schema('product', {'type': 'object'}, ['sku'])
+        writer.write_record('product', {'sku': 'a1b2c3'})
+        writer.write_record('price_point', {'sku': 'a1b2c3', 'price': 1.1})
+        writer.write_state({'bookmarks': {}})
+        writer.close()
+
+        messages = self.written_messages()
+        self.assertEqual(['SCHEMA', 'BATCH', 'BATCH', 'STATE'], [message['type'] for message in messages])
+        self.assertEqual(['product', 'price_point'], [message['stream'] for message in messages[1:3]])
+        self.assertEqual([{'sku': 'a1b2c3', 'price': 1.1}], self.read_batch(messages[2]))
+
+    def test_should_hold_state_until_file_is_full(self):
+        writer = self.build_writer(rows_per_file=2)
+        writer.write_record('product', {'sku': 'a1b2c3'})
+        writer.write_record('price_point', {'sku': 'a1b2c3', 'price': 1.1})
+        writer.write_state({'page': 1})
+        writer.write_state({'page': 2})
+        self.assertEqual([], self.written_messages())
+
+        writer.write_record('product', {'sku': 'd4e5f6'})
+        writer.write_record('product', {'sku': 'g7h8i9'})
+        writer.close()
+
+        messages = self.written_messages()
+        self.assertEqual(['BATCH', 'BATCH', 'STATE', 'BATCH'], [message['type'] for message in messages])
+        self.assertEqual({'page': 2}, messages[2]['value'])
+        self.assertEqual([{'sku': 'g7h8i9'}], self.read_batch(messages[3]))
+
+    def test_should_write_state_after_rows_per_state(self):
+        writer = self.build_writer(rows_per_file=100, rows_per_state=2)
+        writer.write_record('product', {'sku': 'a1b2c3'})
+        writer.write_state({'page': 1})
+        self.assertEqual([], self.written_messages())
+
+        writer.write_record('product', {'sku': 'd4e5f6'})
+        writer.write_state({'page': 2})
+        writer.write_state({'page': 3})
+
+        messages = self.written_messages()
+        self.assertEqual(['BATCH', 'STATE', 'STATE'], [message['type'] for message in messages])
+        self.assertEqual([{'sku': 'a1b2c3'}, {'sku': 'd4e5f6'}], self.read_batch(messages[0]))
+        self.assertEqual([{'page': 2}, {'page': 3}], [message['value'] for message in messages[1:]])
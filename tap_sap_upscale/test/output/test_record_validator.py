@@ -0,0 +1,109 @@
+import json
+import os
+import tempfile
+import unittest
+
+from unittest import mock
+
+from tap_sap_upscale.output.record_validator import RecordValidator, SchemaValidator, ValidatingWriter
+
+price_point_schema = {
+    'type': 'object',
+    'properties': {
+        'id': {'type': 'string'},
+        'timestamp': {'type': 'string', 'format': 'date-time'},
+        'price': {'type': 'number'},
+        'stock': {'type': ['null', 'number']}
+    },
+    'additionalProperties': False
+}
+
+price_point = {'id': '1', 'timestamp': '2026-01-01T00:00:00.123456+00:00', 'price': 1.1, 'stock': None}
+
+
+class TestSchemaValidator(unittest.TestCase):
+    def setUp(self):
+        self.validator = SchemaValidator(price_point_schema)
+
+    def test_should_accept_valid_record(self):
+        self.assertEqual([], self.validator.errors(price_point))
+        self.assertEqual([], self.validator.errors(dict(price_point, price=2, stock=3.5)))
+
+    def test_should_report_wrong_types(self):
+        self.assertEqual(['record.price is NoneType, expected number'],
+                         self.validator.errors(dict(price_point, price=None)))
+        # Booleans are not numbers in JSON
+        self.assertEqual(['record.stock is bool, expected null or number'],
+                         self.validator.errors(dict(price_point, stock=True)))
+
+    def test_should_report_properties_not_in_schema(self):
+        self.assertEqual(['record.sku is not in the schema'], self.validator.errors(dict(price_point, sku='a1b2c3')))
+
+    def test_should_report_invalid_date_times(self):
+        self.assertEqual(['record.timestamp is not a date-time: yesterday'],
+                         self.validator.errors(dict(price_point, timestamp='yesterday')))
+
+    def test_should_check_nested_values(self):
+        validator = SchemaValidator({
+            'type': 'object',
+            'properties': {
+                'images': {'type': 'array', 'items': {'type': 'object', 'required': ['uri']}}
+            }
+        })
+
+        self.assertEqual(['record.images[1].uri is missing', 'record.images[2] is str, expected object'],
+                         validator.errors({'images': [{'uri': 'a'}, {}, 'b']}))
+
+    def test_should_accept_values_the_type_check_does_not_list(self):
+        validator = SchemaValidator({'type': 'object', 'properties': {'n': {'type': 'integer'}}})
+
+        self.assertTrue(validator.is_valid({'n': 5.0}))
+        self.assertEqual([], validator.errors({'n': 5.0}))
+        self.assertFalse(validator.is_valid({'n': 5.5}))
+        self.assertEqual(['record.n is float, expected integer'], validator.errors({'n': 5.5}))
+
+
+class TestRecordValidator(unittest.TestCase):
+    records = [('price_point', price_point), ('price_point', dict(price_point, price=None)), ('product', {})]
+
+    @mock.patch('tap_sap_upscale.output.record_validator.LOGGER')
+    def test_should_write_invalid_records_in_warn_mode(self, logger):
+        validator = RecordValidator({'price_point': price_point_schema}, mode='warn')
+
+        self.assertEqual(self.records, validator.validate(self.records))
+        self.assertEqual({'price_point': 1}, validator.violations)
+        logger.warning.assert_called_once()
+
+    def test_should_quarantine_invalid_records(self):
+        path = os.path.join(tempfile.mkdtemp(), 'quarantine.jsonl')
+        validator = RecordValidator({'price_point': price_point_schema}, mode='quarantine', quarantine_path=path)
+
+        self.assertEqual([self.records[0], self.records[2]], validator.validate(self.records))
+        with open(path) as file:
+            self.assertEqual([{'stream': 'price_point', 'record': dict(price_point, price=None),
+                               'errors': ['record.price is NoneType, expected number']}],
+                             [json.loads(line) for line in file])
+
+    def test_should_fail_on_invalid_record_in_fail_mode(self):
+        validator = RecordValidator({'price_point': price_point_schema}, mode='fail')
+
+        self.assertRaises(Exception, validator.validate, self.records)
+
+    def test_should_reject_unknown_mode(self):
+        self.assertRaises(Exception, RecordValidator, {}, mode='ignore')
+
+    def test_should_only_validate_when_enabled(self):
+        self.assertIsNone(RecordValidator.from_config({}, {}))
+        self.assertEqual('warn', RecordValidator.from_config({'validate_records': True}, {}).mode)
+
+
+class TestValidatingWriter(unittest.TestCase):
+    def test_should_write_valid_records_in_batch(self):
+        writer = mock.Mock()
+        validator = RecordValidator({'price_point': price_point_schema}, mode='quarantine',
+                                    quarantine_path=os.path.join(tempfile.mkdtemp(), 'quarantine.jsonl'))
+
+        ValidatingWriter(writer, validator).write_records(TestRecordValidator.records)
+
+        writer.write_records.assert_called_once_with(
+            [TestRecordValidator.records[0], TestRecordValidator.records[2]])
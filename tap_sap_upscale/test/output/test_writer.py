@@ -0,0 +1,48 @@
+import io
+import json
+import unittest
+
+from tap_sap_upscale.output.writer import RecordWriter
+
+
+class TestRecordWriter(unittest.TestCase):
+    def setUp(self):
+        self.output = io.TextIOWrapper(io.BytesIO(), encoding='utf-8')
+
+    def written_messages(self):
+        return [json.loads(line) for line in self.output.buffer.getvalue().decode('utf-8').splitlines()]
+
+    def test_should_write_singer_messages(self):
+        writer = RecordWriter(self.output)
+        writer.write_schema('product', {'type': 'object'}, ['sku', 'tenantId'])
+        writer.write_record('product', {'sku': 'a1b2c3', 'name': 'Pröduct 1'})
+        writer.write_state({'bookmarks': {}})
+
+        self.assertEqual([
+            {'type': 'SCHEMA', 'stream': 'product', 'schema': {'type': 'object'}, 'key_properties': ['sku', 'tenantId']},
+            {'type': 'RECORD', 'stream': 'product', 'record': {'sku': 'a1b2c3', 'name': 'Pröduct 1'}},
+            {'type': 'STATE', 'value': {'bookmarks': {}}}
+        ], self.written_messages())
+
+    def test_should_buffer_records_until_state(self):
+        writer = RecordWriter(self.output, buffer_bytes=1024 * 1024, flush_interval=3600)
+        writer.write_record('product', {'sku': 'a1b2c3'})
+        self.assertEqual([], self.written_messages())
+
+        writer.write_state({})
+        self.assertEqual(['RECORD', 'STATE'], [message['type'] for message in self.written_messages()])
+
+    def test_should_flush_full_buffer(self):
+        writer = RecordWriter(self.output, buffer_bytes=1, flush_interval=3600)
+        writer.write_record('product', {'sku': 'a1b2c3'})
+
+        self.assertEqual(1, len(self.written_messages()))
+
+    def test_should_write_to_text_streams(self):
+        output = io.StringIO()
+        writer = RecordWriter(output)
+        writer.write_record('price_point', {'price': 1.1})
+        writer.close()
+
+        self.assertEqual({'type': 'RECORD', 'stream': 'price_point', 'record': {'price': 1.1}},
+                         json.loads(output.getvalue()))
@@ -0,0 +1,93 @@
+import random
+import threading
+import time
+import unittest
+
+from tap_sap_upscale.pipeline.sync_pipeline import SyncPipeline
+
+
+class ListWriter:
+    def __init__(self, release=None):
+        self.messages = []
+        self.release = release
+
+    def write_record(self, stream, record):
+        if self.release is not None:
+            self.release.wait()
+        self.messages.append(('record', stream, record))
+
+    def write_records(self, records):
+        for stream, record in records:
+            self.write_record(stream, record)
+
+    def write_state(self, value):
+        self.messages.append(('state', dict(value)))
+
+
+class TestSyncPipeline(unittest.TestCase):
+    def test_should_transform_pages_in_order(self):
+        writer = ListWriter()
+        pipeline = SyncPipeline(writer, enrich_workers=4, queue_size=2)
+
+        def enrich(page):
+            # Pages are enriched out of order
+            time.sleep(random.uniform(0, 0.01))
+            return page
+
+        def transform(page):
+            pipeline.output.write_record('product', {'page': page})
+
+        pipeline.run(iter(range(20)), enrich, transform)
+
+        self.assertEqual([('record', 'product', {'page': page}) for page in range(20)], writer.messages)
+
+    def test_should_write_state_after_the_records_it_covers(self):
+        writer = ListWriter()
+        pipeline = SyncPipeline(writer)
+        state = {}
+
+        def transform(page):
+            pipeline.output.write_record('product', {'page': page})
+            state['page'] = page
+            pipeline.output.write_state(state)
+
+        pipeline.run(iter(range(3)), lambda page: page, transform)
+
+        self.assertEqual([
+            ('record', 'product', {'page': 0}), ('state', {'page': 0}),
+            ('record', 'product', {'page': 1}), ('state', {'page': 1}),
+            ('record', 'product', {'page': 2}), ('state', {'page': 2})
+        ], writer.messages)
+
+    def test_should_hold_back_fetch_while_output_is_blocked(self):
+        release = threading.Event()
+        writer = ListWriter(release)
+        pipeline = SyncPipeline(writer, enrich_workers=1, queue_size=1)
+        fetched = []
+
+        def pages():
+            for page in range(100):
+                fetched.append(page)
+                yield page
+
+        thread = threading.Thread(target=pipeline.run, args=(
+            pages(), lambda page: page, lambda page: pipeline.output.write_record('product', {'page': page})))
+        thread.start()
+
+        time.sleep(0.3)
+        self.assertLess(len(fetched), 10)
+
+        release.set()
+        thread.join()
+        self.assertEqual(100, len(writer.messages))
+
+    def test_should_raise_errors_of_any_stage(self):
+        pipeline = SyncPipeline(ListWriter())
+
+        def enrich(page):
+            if page == 5:
+                raise Exception('Failed to enrich page')
+            return page
+
+        with self.assertRaisesRegex(Exception, 'Failed to enrich page'):
+            pipeline.run(iter(range(100)), enrich, lambda page: None)
@@ -2,6 +2,7 @@ import unittest
 
 from tap_sap_upscale.record.factory import build_record_handler
 from tap_sap_upscale.record.record import Record
+from tap_sap_upscale.state.id_map import IdMap
 
 
 class TestCategoryHandler(unittest.TestCase):
@@ -42,3 +43,13 @@ class TestCategoryHandler(unittest.TestCase):
             tenant_id='t1'
         ), 't11')
 
+
+    def test_should_assign_ids_in_given_order(self):
+        handler = build_record_handler(Record.CATEGORY, 'listing-order')
+        handler.load_ids(IdMap())
+        handler.assign_ids(['category_2', 'category_1'], 't1')
+
+        self.assertEqual(handler.generate({'id': 'category_1', 'name': 'laptops'}, tenant_id='t1'), {
+            'id': 't12',
+            'name': 'laptops',
+        })
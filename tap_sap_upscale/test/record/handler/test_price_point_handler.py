@@ -1,6 +1,7 @@
 import unittest
 from datetime import datetime, timezone
 
+from tap_sap_upscale.record.context import RecordContext
 from tap_sap_upscale.record.factory import build_record_handler
 from tap_sap_upscale.record.record import Record
 
@@ -47,4 +48,15 @@ class TestPricePointHandler(unittest.TestCase):
             }
         ])
 
+    def test_should_generate_price_point_records_in_batch(self):
+        timestamp = datetime.now(timezone.utc).isoformat()
+        price_points = build_record_handler(Record.PRICE_POINT).generate_batch([
+            {'sku': 'abc123', 'price': {'sellingPrice': 50.0}},
+            {'sku': 'abc234', 'price': {'sellingPrice': 54.0}}
+        ], RecordContext('t1', timestamp))
 
+        first_counter = int(price_points[0]['id'].rsplit('.', 1)[1])
+        self.assertEqual(["{}.{}".format(timestamp, first_counter), "{}.{}".format(timestamp, first_counter + 1)],
+                         [price_point['id'] for price_point in price_points])
+        self.assertEqual([50.0, 54.0], [price_point['price'] for price_point in price_points])
+        self.assertEqual({'t1'}, {price_point['tenantId'] for price_point in price_points})
@@ -1,5 +1,6 @@
 import unittest
 
+from tap_sap_upscale.record.context import RecordContext
 from tap_sap_upscale.record.factory import build_record_handler
 from tap_sap_upscale.record.record import Record
 
@@ -68,7 +69,8 @@ class TestProductHandler(unittest.TestCase):
                 'manufacturer': None,
                 'reviewAverage': None,
                 'reviewCount': None,
-                'detailsUri': 'http://storefront.test.com/product/123456'
+                'detailsUri': 'http://storefront.test.com/product/123456',
+                'images': 'https://api.test.com/fullsize-image'
             },
             {
                 'sku': '234567',
@@ -84,6 +86,28 @@ class TestProductHandler(unittest.TestCase):
                 'manufacturer': None,
                 'reviewAverage': None,
                 'reviewCount': None,
-                'detailsUri': 'http://storefront.test.com/product/234567'
+                'detailsUri': 'http://storefront.test.com/product/234567',
+                'images': 'https://api.test.com/fullsize-image'
             }
         ])
+
+    def test_should_generate_product_records_in_batch(self):
+        context = RecordContext('t1', config={'ui_scheme': 'http', 'ui_base_url': 'storefront.test.com'})
+        products = build_record_handler(Record.PRODUCT).generate_batch([
+            {
+                'id': '123456',
+                'media': [
+                    {'fullSize': 'https://api.test.com/fullsize-image'},
+                    {'fullSize': 'https://api.test.com/fullsize-image-2'}
+                ]
+            },
+            {
+                'id': '234567'
+            }
+        ], context)
+
+        self.assertEqual(['http://storefront.test.com/product/123456', 'http://storefront.test.com/product/234567'],
+                         [product['detailsUri'] for product in products])
+        self.assertEqual(['https://api.test.com/fullsize-image', None], [product['imageUri'] for product in products])
+        self.assertEqual(['https://api.test.com/fullsize-image | https://api.test.com/fullsize-image-2', ''],
+                         [product['images'] for product in products])
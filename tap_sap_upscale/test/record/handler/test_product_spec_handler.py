@@ -32,7 +32,7 @@ class TestProductSpecHandler(unittest.TestCase):
             {
                 'tenantId': 't1',
                 'sku': 'abc123',
-                # 'specId': 't11',
+                'specId': 't11',
                 'value': '1.23',
                 'pureValue': '1.23',
                 'type': None,
@@ -42,7 +42,7 @@ class TestProductSpecHandler(unittest.TestCase):
             {
                 'tenantId': 't1',
                 'sku': 'abc123',
-                # 'specId': 't12',
+                'specId': 't12',
                 'value': '2.34 unit',
                 'pureValue': None,
                 'type': None,
@@ -50,3 +50,10 @@ class TestProductSpecHandler(unittest.TestCase):
                 'interpretedValue': None,
             },
         ])
+
+    def test_should_convert_non_text_values(self):
+        spec = build_record_handler(Record.PRODUCT_SPEC).generate({'attributeKey': '123', 'value': 12},
+                                                                   tenant_id='t1', sku='abc123', spec_id='t11')
+
+        self.assertEqual('12', spec['value'])
+        self.assertEqual('12', spec['pureValue'])
@@ -2,6 +2,7 @@ import unittest
 
 from tap_sap_upscale.record.factory import build_record_handler
 from tap_sap_upscale.record.record import Record
+from tap_sap_upscale.state.id_map import IdMap
 
 
 class TestSpecHandler(unittest.TestCase):
@@ -49,3 +50,10 @@ class TestSpecHandler(unittest.TestCase):
             },
             tenant_id='t1'
         ), 't12')
+
+    def test_should_build_spec_ids_from_attribute_keys_when_keyed(self):
+        handler = build_record_handler(Record.SPEC, 'keyed')
+        handler.load_ids(IdMap(), keyed=True)
+
+        self.assertEqual('t1.345', handler.generate({'attributeKey': '345', 'label': 'Label'}, tenant_id='t1')['id'])
+        self.assertEqual('t1.345', handler.generate({'attributeKey': '345', 'label': 'Label'}, tenant_id='t1'))
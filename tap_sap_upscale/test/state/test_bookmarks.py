@@ -0,0 +1,90 @@
+import unittest
+
+from unittest import mock
+
+from tap_sap_upscale.state.bookmarks import PageBookmark
+
+config = {
+    'api_selling_tree': 'a1b2-c3d4-e5f6',
+    'api_edition_id': 'edition',
+    'state_interval_pages': 2
+}
+
+
+class TestPageBookmark(unittest.TestCase):
+    def test_should_start_from_first_page_without_bookmark(self):
+        self.assertEqual(1, PageBookmark({}, config).resume_page())
+
+    def test_should_resume_from_page_after_bookmark(self):
+        state = {
+            'bookmarks': {
+                'product': {
+                    'selling_tree': 'a1b2-c3d4-e5f6',
+                    'edition_id': 'edition',
+                    'page': 41
+                }
+            }
+        }
+
+        self.assertEqual(42, PageBookmark(state, config).resume_page())
+
+    def test_should_ignore_bookmark_of_other_selling_tree(self):
+        state = {
+            'bookmarks': {
+                'product': {
+                    'selling_tree': 'f6e5-d4c3-b2a1',
+                    'edition_id': 'edition',
+                    'page': 41
+                }
+            }
+        }
+
+        self.assertEqual(1, PageBookmark(state, config).resume_page())
+
+    def test_should_only_resume_bookmark_of_same_shard(self):
+        state = {}
+        PageBookmark(state, dict(config, shard='2/4')).page_synced(41)
+
+        self.assertEqual('2/4', state['bookmarks']['product']['shard'])
+        self.assertEqual(42, PageBookmark(state, dict(config, shard='2/4')).resume_page())
+        self.assertEqual(1, PageBookmark(state, dict(config, shard='3/4')).resume_page())
+        self.assertEqual(1, PageBookmark(state, config).resume_page())
+
+    def test_should_only_resume_bookmark_of_same_page_size(self):
+        state = {}
+        PageBookmark(state, dict(config, page_size=100)).page_synced(41)
+
+        self.assertEqual(42, PageBookmark(state, dict(config, page_size=100)).resume_page())
+        self.assertEqual(1, PageBookmark(state, dict(config, page_size=50)).resume_page())
+        self.assertEqual(1, PageBookmark(state, config).resume_page())
+
+    def test_should_write_state_every_interval(self):
+        state = {}
+        write_state = mock.Mock()
+        bookmark = PageBookmark(state, config, write_state=write_state)
+
+        bookmark.page_synced(1)
+        write_state.assert_not_called()
+
+        bookmark.page_synced(2)
+        write_state.assert_called_once_with({
+            'bookmarks': {
+                'product': {
+                    'selling_tree': 'a1b2-c3d4-e5f6',
+                    'edition_id': 'edition',
+                    'page_size': 50,
+                    'page': 2
+                }
+            }
+        })
+
+    def test_should_clear_page_once_sync_completed(self):
+        state = {}
+        write_state = mock.Mock()
+        bookmark = PageBookmark(state, config, write_state=write_state)
+
+        bookmark.page_synced(1)
+        bookmark.sync_completed()
+
+        write_state.assert_called_once()
+        self.assertEqual(1, PageBookmark(state, config).resume_page())
@@ -0,0 +1,52 @@
+import unittest
+
+from tap_sap_upscale.state.fingerprints import RecordFingerprints, fingerprint
+
+
+class TestRecordFingerprints(unittest.TestCase):
+    def test_should_ignore_key_order(self):
+        self.assertEqual(fingerprint({'sku': 'a1b2c3', 'name': 'Product'}),
+                         fingerprint({'name': 'Product', 'sku': 'a1b2c3'}))
+        self.assertNotEqual(fingerprint({'sku': 'a1b2c3', 'name': 'Product'}),
+                            fingerprint({'sku': 'a1b2c3', 'name': 'Renamed product'}))
+
+    def test_should_only_report_changed_records(self):
+        state = {}
+        fingerprints = RecordFingerprints(state, ['product'])
+        self.assertTrue(fingerprints.changed('product', 'a1b2c3', {'sku': 'a1b2c3', 'regularPrice': 1.1}))
+        fingerprints.save()
+
+        fingerprints = RecordFingerprints(state, ['product'])
+        self.assertFalse(fingerprints.changed('product', 'a1b2c3', {'sku': 'a1b2c3', 'regularPrice': 1.1}))
+        self.assertTrue(fingerprints.changed('product', 'a1b2c3', {'sku': 'a1b2c3', 'regularPrice': 2.2}))
+
+    def test_should_report_every_record_when_disabled(self):
+        state = {}
+        fingerprints = RecordFingerprints(state, ['product'], enabled=False)
+
+        self.assertTrue(fingerprints.changed('product', 'a1b2c3', {'sku': 'a1b2c3'}))
+        self.assertTrue(fingerprints.changed('product', 'a1b2c3', {'sku': 'a1b2c3'}))
+        self.assertEqual({}, state)
+
+    def test_should_detect_deleted_skus(self):
+        state = {}
+        fingerprints = RecordFingerprints(state, ['product'])
+        fingerprints.changed('product', 'a1b2c3', {'sku': 'a1b2c3'})
+        fingerprints.changed('product', 'd4e5f6', {'sku': 'd4e5f6'})
+        fingerprints.save()
+
+        fingerprints = RecordFingerprints(state, ['product'])
+        fingerprints.changed('product', 'a1b2c3', {'sku': 'a1b2c3'})
+
+        self.assertEqual({'product': ['d4e5f6']}, fingerprints.remove_deleted())
+        fingerprints.save()
+        self.assertEqual(['a1b2c3'], list(state['fingerprints']['product']))
+
+    def test_should_leave_fingerprints_out_of_state_until_saved(self):
+        state = {'fingerprints': {'product': {'a1b2c3': 'digest'}}}
+        fingerprints = RecordFingerprints(state, ['product'])
+        fingerprints.changed('product', 'd4e5f6', {'sku': 'd4e5f6'})
+
+        self.assertEqual({}, state)
+        fingerprints.save()
+        self.assertEqual(['a1b2c3', 'd4e5f6'], list(state['fingerprints']['product']))
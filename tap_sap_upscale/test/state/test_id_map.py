@@ -0,0 +1,47 @@
+import unittest
+
+from tap_sap_upscale.state.id_map import IdMap
+
+
+class TestIdMap(unittest.TestCase):
+    def test_should_generate_ids_from_codes(self):
+        ids = IdMap()
+
+        self.assertEqual('t11', ids.assign('category_1', 't1'))
+        self.assertEqual('t12', ids.assign('category_2', 't1'))
+        self.assertEqual('t11', ids.assign('category_1', 't1'))
+        self.assertEqual('t12', ids.get('category_2'))
+        self.assertIsNone(ids.get('category_3'))
+
+    def test_should_keep_ids_in_state(self):
+        state = {}
+        IdMap.from_state(state, 'category').assign('category_1', 't1')
+
+        ids = IdMap.from_state(state, 'category')
+        self.assertEqual('t11', ids.assign('category_1', 't1'))
+        self.assertEqual('t12', ids.assign('category_2', 't1'))
+        self.assertEqual({
+            'id_maps': {
+                'category': {
+                    'nextCode': 3,
+                    'ids': {
+                        'category_1': 't11',
+                        'category_2': 't12'
+                    }
+                }
+            }
+        }, state)
+
+    def test_should_assign_given_ids(self):
+        ids = IdMap()
+
+        self.assertEqual('t1.key_1', ids.assign_id('key_1', 't1.key_1'))
+        self.assertEqual('t1.key_1', ids.assign_id('key_1', 'other'))
+        self.assertEqual('t11', ids.assign('key_2', 't1'))
+
+    def test_should_assign_ids_in_given_order(self):
+        ids = IdMap()
+        ids.assign('category_2', 't1')
+        ids.assign_all(['category_1', 'category_2', 'category_3'], 't1')
+
+        self.assertEqual({'category_2': 't11', 'category_1': 't12', 'category_3': 't13'}, ids.mapping['ids'])
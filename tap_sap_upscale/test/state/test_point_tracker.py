@@ -0,0 +1,48 @@
+import unittest
+
+from tap_sap_upscale.state.point_tracker import PointTracker
+
+
+class TestPointTracker(unittest.TestCase):
+    def test_should_only_report_moved_values(self):
+        state = {}
+        points = PointTracker(state, ['price_point'], now=0)
+        self.assertTrue(points.changed('price_point', 'a1b2c3', 1.1))
+        points.save()
+
+        points = PointTracker(state, ['price_point'], now=3600)
+        self.assertFalse(points.changed('price_point', 'a1b2c3', 1.1))
+        self.assertTrue(points.changed('price_point', 'a1b2c3', 1.2))
+        self.assertEqual({}, state)
+        points.save()
+        self.assertEqual({'points': {'price_point': {'a1b2c3': [1.2, 3600]}}}, state)
+
+    def test_should_report_unchanged_values_after_heartbeat(self):
+        state = {'points': {'stock_point': {'a1b2c3': [5, 0]}}}
+
+        self.assertFalse(PointTracker(dict(state), ['stock_point'], heartbeat=86400, now=86399)
+                         .changed('stock_point', 'a1b2c3', 5))
+        self.assertTrue(PointTracker(dict(state), ['stock_point'], heartbeat=86400, now=86400)
+                        .changed('stock_point', 'a1b2c3', 5))
+
+    def test_should_report_every_value_when_disabled(self):
+        state = {}
+        points = PointTracker(state, ['price_point'], enabled=False)
+
+        self.assertTrue(points.changed('price_point', 'a1b2c3', 1.1))
+        self.assertTrue(points.changed('price_point', 'a1b2c3', 1.1))
+        self.assertEqual({}, state)
+
+    def test_should_forget_unseen_skus(self):
+        state = {}
+        points = PointTracker(state, ['price_point'], now=0)
+        points.changed('price_point', 'a1b2c3', 1.1)
+        points.changed('price_point', 'd4e5f6', 2.2)
+        points.save()
+
+        points = PointTracker(state, ['price_point'], now=60)
+        points.changed('price_point', 'a1b2c3', 1.1)
+        points.remove_unseen()
+        points.save()
+
+        self.assertEqual(['a1b2c3'], list(state['points']['price_point']))
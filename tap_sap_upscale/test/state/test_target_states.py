@@ -0,0 +1,43 @@
+import json
+import unittest
+
+from tap_sap_upscale.state.target_states import TargetStates, TargetWriter
+
+
+class TestTargetStates(unittest.TestCase):
+    def setUp(self):
+        self.written = []
+        self.state = {'targets': {'t1/tree': {'bookmarks': {'product': {'page': 4}}}}}
+        self.states = TargetStates(self.state, lambda value: self.written.append(json.loads(value)))
+
+    def test_should_combine_committed_states_of_every_target(self):
+        TargetWriter(None, self.states, 't2/tree').write_state({'bookmarks': {'product': {'page': 1}}})
+
+        self.assertEqual([{'targets': {
+            't1/tree': {'bookmarks': {'product': {'page': 4}}},
+            't2/tree': {'bookmarks': {'product': {'page': 1}}}
+        }, 'tenants': {}}], self.written)
+
+    def test_should_not_write_uncommitted_changes_of_other_targets(self):
+        self.states.target_state('t1/tree')['bookmarks']['product']['page'] = 5
+        self.states.commit('t2/tree', {})
+
+        self.assertEqual(4, self.written[-1]['targets']['t1/tree']['bookmarks']['product']['page'])
+
+    def test_should_share_id_maps_between_targets_of_a_tenant(self):
+        self.assertIs(self.states.id_map('t1', 'category'), self.states.id_map('t1', 'category'))
+        self.assertIsNot(self.states.id_map('t1', 'category'), self.states.id_map('t2', 'category'))
+
+        self.states.id_map('t1', 'category').assign('category_1', 't1')
+        self.states.commit('t1/tree', {})
+
+        self.assertEqual({'nextCode': 2, 'ids': {'category_1': 't11'}},
+                         self.written[-1]['tenants']['t1']['id_maps']['category'])
+        self.assertEqual({'nextCode': 1, 'ids': {}}, self.written[-1]['tenants']['t2']['id_maps']['category'])
+
+    def test_should_reuse_id_maps_of_previous_syncs(self):
+        state = {'tenants': {'t1': {'id_maps': {'category': {'nextCode': 3, 'ids': {'category_1': 't12'}}}}}}
+        states = TargetStates(state, self.written.append)
+
+        self.assertEqual('t12', states.id_map('t1', 'category').assign('category_1', 't1'))
+        self.assertEqual('t13', states.id_map('t1', 'category').assign('category_2', 't1'))
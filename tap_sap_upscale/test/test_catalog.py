@@ -0,0 +1,74 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from tap_sap_upscale import discover
+from tap_sap_upscale.catalog import CATALOG_PATH, CATALOG_VERSION, compile_catalog, load_catalog
+
+# Modules only the sync needs, which discovery must not import
+SYNC_MODULES = [
+    'tap_sap_upscale.runner',
+    'tap_sap_upscale.client.upscale_client',
+    'tap_sap_upscale.record.factory',
+    'tap_sap_upscale.pipeline.sync_pipeline',
+    'orjson',
+    'ijson'
+]
+
+COLD_START_SCRIPT = """
+import contextlib, io, json, sys, time
+started_at = time.perf_counter()
+import tap_sap_upscale
+with contextlib.redirect_stdout(io.StringIO()):
+    tap_sap_upscale.discover().dump()
+print(json.dumps({'seconds': time.perf_counter() - started_at, 'modules': sorted(sys.modules)}))
+"""
+
+
+class TestCatalog(unittest.TestCase):
+    def test_should_ship_catalog_compiled_from_current_schemas(self):
+        with open(CATALOG_PATH) as file:
+            shipped = json.load(file)
+
+        # Compile it again with tap_sap_upscale.catalog.write_catalog() after changing a schema
+        self.assertEqual(compile_catalog(), shipped)
+
+    def test_should_compile_catalog_without_artifact(self):
+        path = os.path.join(tempfile.mkdtemp(), 'missing.json')
+
+        self.assertEqual(compile_catalog()['streams'], load_catalog(path)['streams'])
+
+    def test_should_compile_catalog_of_other_version(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as file:
+            json.dump({'version': 0, 'streams': []}, file)
+        self.addCleanup(os.remove, file.name)
+
+        self.assertEqual(compile_catalog()['streams'], load_catalog(file.name)['streams'])
+
+    def test_should_compile_catalog_of_other_schemas(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as file:
+            json.dump({'version': CATALOG_VERSION, 'digest': 'edited', 'streams': []}, file)
+        self.addCleanup(os.remove, file.name)
+
+        self.assertEqual(compile_catalog()['streams'], load_catalog(file.name)['streams'])
+
+    def test_should_discover_key_properties(self):
+        catalog = discover()
+
+        self.assertEqual(['sku', 'tenantId', 'categoryId'], catalog.get_stream('category_product').key_properties)
+        self.assertEqual(['customerId', 'tenantId', 'sku'],
+                         catalog.get_stream('customer_specific_price').key_properties)
+        self.assertTrue(all(stream.is_selected() for stream in catalog.streams))
+
+
+class TestColdStart(unittest.TestCase):
+    def test_should_discover_without_importing_sync_modules(self):
+        output = subprocess.run([sys.executable, '-c', COLD_START_SCRIPT], check=True, capture_output=True, text=True)
+        result = json.loads(output.stdout)
+
+        self.assertEqual([], [module for module in SYNC_MODULES if module in result['modules']])
+        # A generous bound, only meant to catch a heavy import creeping back into discovery
+        self.assertLess(result['seconds'], 5)
@@ -0,0 +1,309 @@
+import contextlib
+import httpretty
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+import warnings
+
+from tap_sap_upscale import discover, sync
+from tap_sap_upscale.client.upscale_client import UpscaleClient
+from tap_sap_upscale.runner import build_target_config
+from tap_sap_upscale.test.client.test_upscale_client import \
+    category_search_response, custom_attribute_response, inventory_result, product_search_response
+
+config = {
+    'tenant_id': 't1',
+    'api_scheme': 'https',
+    'api_base_url': 'api.test.com',
+    'api_selling_tree': 'a1b2-c3d4-e5f6',
+    'ui_scheme': 'https',
+    'ui_base_url': 'storefront.test.com'
+}
+
+
+def run_sync(config, state, catalog=None):
+    """ Run a sync and return the Singer messages it wrote """
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        sync(config, state, catalog if catalog is not None else discover())
+
+    return [json.loads(line) for line in output.getvalue().splitlines()]
+
+
+def select_streams(streams):
+    catalog = discover()
+    for stream in catalog.streams:
+        stream.metadata = [{'metadata': {'selected': stream.tap_stream_id in streams}, 'breadcrumb': []}]
+
+    return catalog
+
+
+def records(messages, stream):
+    return [message['record'] for message in messages
+            if message['type'] == 'RECORD' and message['stream'] == stream]
+
+
+def last_state(messages):
+    return [message['value'] for message in messages if message['type'] == 'STATE'][-1]
+
+
+class TestSync(unittest.TestCase):
+    def setUp(self):
+        warnings.filterwarnings("ignore", category=ResourceWarning, message="unclosed.*")
+
+        httpretty.enable()
+        self.addCleanup(httpretty.reset)
+        self.addCleanup(httpretty.disable)
+
+        client = UpscaleClient(config)
+        httpretty.register_uri(
+            httpretty.GET,
+            client.product_search_url.format('a1b2-c3d4-e5f6', 1, 50),
+            body=json.dumps(product_search_response))
+
+        httpretty.register_uri(
+            httpretty.GET,
+            client.category_search_url.format(1, 50),
+            body=json.dumps(category_search_response))
+
+        httpretty.register_uri(
+            httpretty.GET,
+            client.custom_attribute_url.format('attribute_key'),
+            body=json.dumps(custom_attribute_response))
+
+        httpretty.register_uri(
+            httpretty.GET,
+            client.inventory_search_url.format(''),
+            body=json.dumps(inventory_result))
+
+    def test_should_sync_products(self):
+        messages = run_sync(config, {})
+
+        self.assertEqual(['a1b2c3', 'd4e5f6'], [record['sku'] for record in records(messages, 'product')])
+        self.assertEqual(2, len(records(messages, 'category_product')))
+        self.assertEqual(2, len(records(messages, 'price_point')))
+        self.assertEqual([5, 1], [record['stock'] for record in records(messages, 'stock_point')])
+        self.assertEqual('STATE', messages[-1]['type'])
+
+    def test_should_only_emit_changed_records(self):
+        changes_only_config = dict(config, emit_changed_records_only=True)
+        messages = run_sync(changes_only_config, {})
+
+        messages = run_sync(changes_only_config, last_state(messages))
+
+        self.assertEqual([], records(messages, 'product'))
+        self.assertEqual([], records(messages, 'category_product'))
+        self.assertEqual(2, len(records(messages, 'price_point')))
+
+    def test_should_only_keep_fingerprints_and_points_in_final_state(self):
+        changes_only_config = dict(config, emit_changed_records_only=True, emit_point_changes_only=True,
+                                   state_interval_pages=1)
+        states = [message['value'] for message in run_sync(changes_only_config, {}) if message['type'] == 'STATE']
+
+        self.assertEqual(2, len(states))
+        self.assertNotIn('fingerprints', states[0])
+        self.assertNotIn('points', states[0])
+        self.assertEqual(['a1b2c3', 'd4e5f6'], sorted(states[-1]['fingerprints']['product']))
+        self.assertEqual(['a1b2c3', 'd4e5f6'], sorted(states[-1]['points']['price_point']))
+
+    def test_should_only_emit_moved_points(self):
+        changes_only_config = dict(config, emit_point_changes_only=True)
+        messages = run_sync(changes_only_config, {})
+
+        messages = run_sync(changes_only_config, last_state(messages))
+
+        self.assertEqual(2, len(records(messages, 'product')))
+        self.assertEqual([], records(messages, 'price_point'))
+        self.assertEqual([], records(messages, 'stock_point'))
+
+    def test_should_reuse_category_ids_of_previous_syncs(self):
+        state = {
+            'id_maps': {
+                'category': {
+                    'nextCode': 8,
+                    'ids': {
+                        'category_id_2': 't17'
+                    }
+                }
+            }
+        }
+        messages = run_sync(config, state)
+
+        self.assertEqual({'t18': 'Category name', 't17': 'Category name 2'},
+                         {record['id']: record['name'] for record in records(messages, 'category')})
+        self.assertEqual(['t18', 't17'], [record['categoryId'] for record in records(messages, 'category_product')])
+        self.assertEqual({'category_id': 't18', 'category_id_2': 't17'},
+                         last_state(messages)['id_maps']['category']['ids'])
+
+    def test_should_sync_specs_from_custom_attributes(self):
+        messages = run_sync(config, {})
+
+        self.assertEqual([{'id': 't11', 'name': 'Attribute label', 'unitName': None, 'unitSymbol': None,
+                           'comparable': None}], records(messages, 'spec'))
+        self.assertEqual([('a1b2c3', 't11', 'value'), ('d4e5f6', 't11', 'value')],
+                         [(record['sku'], record['specId'], record['value'])
+                          for record in records(messages, 'product_spec')])
+        self.assertEqual(1, len([request for request in httpretty.latest_requests()
+                                 if '/custom-attributes/' in request.path]))
+
+    def test_should_key_spec_ids_by_attribute_with_deterministic_ids(self):
+        messages = run_sync(dict(config, deterministic_ids=True), {})
+
+        self.assertEqual(['t1.attribute_key'], [record['id'] for record in records(messages, 'spec')])
+        self.assertEqual({'t1.attribute_key'}, {record['specId'] for record in records(messages, 'product_spec')})
+
+    def test_should_write_batches_in_batch_mode(self):
+        batch_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, batch_dir)
+
+        messages = run_sync(dict(config, batch_mode=True, batch_dir=batch_dir), {})
+
+        self.assertEqual([], [message for message in messages if message['type'] == 'RECORD'])
+        self.assertEqual({'product', 'category', 'category_product', 'spec', 'product_spec', 'price_point',
+                          'stock_point'},
+                         {message['stream'] for message in messages if message['type'] == 'BATCH'})
+
+    def test_should_write_state_every_interval_in_batch_mode(self):
+        batch_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, batch_dir)
+
+        messages = run_sync(dict(config, batch_mode=True, batch_dir=batch_dir, state_interval_pages=1,
+                                 batch_rows_per_state=1), {})
+
+        types = [message['type'] for message in messages if message['type'] in ('BATCH', 'STATE')]
+        self.assertEqual(['STATE', 'STATE'], types[types.index('STATE'):])
+        self.assertEqual(['BATCH'], list(set(types[:types.index('STATE')])))
+
+    def test_should_quarantine_records_violating_their_schema(self):
+        httpretty.register_uri(
+            httpretty.GET,
+            UpscaleClient(config).product_search_url.format('a1b2-c3d4-e5f6', 1, 50),
+            body=json.dumps(dict(product_search_response, content=[
+                product_search_response['content'][0],
+                dict(product_search_response['content'][1], price={})
+            ])))
+
+        quarantine_path = os.path.join(tempfile.mkdtemp(), 'quarantine.jsonl')
+        self.addCleanup(shutil.rmtree, os.path.dirname(quarantine_path))
+        messages = run_sync(dict(config, validate_records='quarantine', quarantine_path=quarantine_path), {})
+
+        # Without a selling price, regularPrice and price are null although their schemas require a number
+        self.assertEqual(['a1b2c3'], [record['sku'] for record in records(messages, 'product')])
+        self.assertEqual(['a1b2c3'], [record['sku'] for record in records(messages, 'price_point')])
+        with open(quarantine_path) as file:
+            quarantined = [json.loads(line) for line in file]
+        self.assertEqual([('product', 'd4e5f6'), ('price_point', 'd4e5f6')],
+                         [(line['stream'], line['record']['sku']) for line in quarantined])
+
+    def test_should_only_fetch_what_selected_streams_need(self):
+        messages = run_sync(config, {}, select_streams(['price_point']))
+
+        self.assertEqual(['price_point'], [message['stream'] for message in messages if message['type'] == 'SCHEMA'])
+        self.assertEqual({'price_point'}, {message['stream'] for message in messages if message['type'] == 'RECORD'})
+        self.assertEqual([1.1, 2.2], [record['price'] for record in records(messages, 'price_point')])
+        self.assertEqual({'/consumer/product-content/sellingtrees/a1b2-c3d4-e5f6/products'},
+                         {request.path.split('?')[0] for request in httpretty.latest_requests()})
+
+    def test_should_merge_shards_into_single_process_output(self):
+        httpretty.reset()
+        client = UpscaleClient(config)
+        for page, products in enumerate([product_search_response['content'][:1],
+                                         product_search_response['content'][1:]], start=1):
+            httpretty.register_uri(
+                httpretty.GET,
+                client.product_search_url.format('a1b2-c3d4-e5f6', page, 50),
+                body=json.dumps(dict(product_search_response, content=products,
+                                     page=dict(product_search_response['page'], totalPages=2, number=page))),
+                match_querystring=True)
+
+        httpretty.register_uri(
+            httpretty.GET,
+            client.category_search_url.format(1, 50),
+            body=json.dumps(category_search_response))
+
+        httpretty.register_uri(
+            httpretty.GET,
+            client.custom_attribute_url.format('attribute_key'),
+            body=json.dumps(custom_attribute_response))
+
+        httpretty.register_uri(
+            httpretty.GET,
+            client.inventory_search_url.format(''),
+            body=json.dumps(inventory_result))
+
+        run_config = dict(config, run_timestamp='2026-01-01T00:00:00+00:00', deterministic_ids=True)
+        single_messages = run_sync(run_config, {})
+        requests_before = len(httpretty.latest_requests())
+        shard_messages = [run_sync(dict(run_config, shard=shard), {}) for shard in ['1/2', '2/2']]
+
+        # Each shard searches page 1 to count the pages, and the first shard syncs it without searching it again
+        self.assertEqual(['1', '1', '2'], sorted(
+            request.querystring['pageNumber'][0] for request in httpretty.latest_requests()[requests_before:]
+            if '/sellingtrees/' in request.path))
+
+        self.assertEqual(['a1b2c3'], [record['sku'] for record in records(shard_messages[0], 'product')])
+        self.assertEqual(['d4e5f6'], [record['sku'] for record in records(shard_messages[1], 'product')])
+        self.assertEqual('2/2', last_state(shard_messages[1])['bookmarks']['product']['shard'])
+        for stream in ['product', 'category', 'category_product', 'price_point', 'stock_point']:
+            self.assertEqual(
+                sorted(json.dumps(record, sort_keys=True) for record in records(single_messages, stream)),
+                sorted(json.dumps(record, sort_keys=True)
+                       for messages in shard_messages for record in records(messages, stream)))
+
+    def test_should_sync_targets_concurrently(self):
+        httpretty.register_uri(
+            httpretty.GET,
+            UpscaleClient(config).product_search_url.format('f6e5-d4c3-b2a1', 1, 50),
+            body=json.dumps(product_search_response))
+
+        targets_config = dict(config, targets=[
+            {'tenant_id': 't1'},
+            {'tenant_id': 't2', 'api_selling_tree': 'f6e5-d4c3-b2a1'}
+        ])
+        messages = run_sync(targets_config, {})
+
+        self.assertEqual(1, len([message for message in messages
+                                 if message['type'] == 'SCHEMA' and message['stream'] == 'product']))
+        for tenant_id in ['t1', 't2']:
+            self.assertEqual(2, len([record for record in records(messages, 'product')
+                                     if record['tenantId'] == tenant_id]))
+            # Category handlers are not shared between targets
+            self.assertEqual(2, len([record for record in records(messages, 'category')
+                                     if record['id'].startswith(tenant_id)]))
+
+        price_point_ids = [record['id'] for record in records(messages, 'price_point')]
+        self.assertEqual(4, len(set(price_point_ids)))
+
+        state = last_state(messages)
+        self.assertEqual({'t1/a1b2-c3d4-e5f6', 't2/f6e5-d4c3-b2a1'}, set(state['targets']))
+        self.assertEqual(2, len(state['tenants']['t2']['id_maps']['category']['ids']))
+
+    def test_should_share_category_ids_between_targets_of_a_tenant(self):
+        httpretty.register_uri(
+            httpretty.GET,
+            UpscaleClient(config).product_search_url.format('f6e5-d4c3-b2a1', 1, 50),
+            body=json.dumps(product_search_response))
+
+        targets_config = dict(config, targets=[
+            {'tenant_id': 't1'},
+            {'tenant_id': 't1', 'api_selling_tree': 'f6e5-d4c3-b2a1'}
+        ])
+        messages = run_sync(targets_config, {})
+
+        # Both selling trees reference the same categories, which keep a single id each
+        self.assertEqual({('t11', 'Category name'), ('t12', 'Category name 2')},
+                         {(record['id'], record['name']) for record in records(messages, 'category')})
+        self.assertEqual({'category_id': 't11', 'category_id_2': 't12'},
+                         last_state(messages)['tenants']['t1']['id_maps']['category']['ids'])
+
+    def test_should_keep_cache_files_per_target(self):
+        targets_config = dict(config, category_cache_path='categories.json', attribute_cache_path='attributes.json',
+                              targets=[{'tenant_id': 't2', 'api_edition_id': 'e2'}])
+
+        target_config = build_target_config(targets_config, targets_config['targets'][0])
+
+        self.assertEqual('categories.json.t2_a1b2-c3d4-e5f6_e2', target_config['category_cache_path'])
+        self.assertEqual('attributes.json.t2_a1b2-c3d4-e5f6_e2', target_config['attribute_cache_path'])